@@ -0,0 +1,83 @@
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+import Levenshtein
+from PIL import Image
+
+from src.the_way_recognition.config import settings
+from src.the_way_recognition.core.ocr import OCRService
+from src.the_way_recognition.utils.image import limit_size
+from src.the_way_recognition.utils.json_to_text import card_json_to_text
+
+MODES = {"current": False, "preprocessed": True}
+
+
+def load_samples(gt_dir: Path, limit: int):
+    samples = []
+    for json_file in sorted((gt_dir / "json").glob("*.json")):
+        png_file = gt_dir / "png" / json_file.with_suffix(".png").name
+        if not png_file.exists():
+            continue
+        with open(json_file, "r", encoding="utf-8") as f:
+            name = json.load(f).get("name", "")
+        samples.append((name, card_json_to_text(json_file), png_file))
+        if limit and len(samples) >= limit:
+            break
+    return samples
+
+
+def benchmark(samples, catalogue, max_dim: int, repeat: int):
+    stats = {mode: {"times": [], "scores": [], "hits": 0} for mode in MODES}
+    for name, gt_text, png_file in samples:
+        # Same decoding and size limit as an uploaded image
+        with Image.open(png_file) as img:
+            image = limit_size(img.convert("RGB"), max_dim)
+
+        for mode, preprocess in MODES.items():
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                text = OCRService.extract_text(image, preprocess=preprocess)
+                times.append(time.perf_counter() - start)
+
+            best = max(catalogue, key=lambda card: Levenshtein.ratio(text, card[1]))
+            stats[mode]["times"].append(min(times))
+            stats[mode]["scores"].append(Levenshtein.ratio(text, gt_text))
+            stats[mode]["hits"] += best[0] == name
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare OCR on the plain RGB image with the OCR preprocessing path"
+    )
+    parser.add_argument("--gt-dir", type=Path, default=Path("data") / "gt")
+    parser.add_argument("--limit", type=int, default=0, help="number of cards, 0 for all")
+    parser.add_argument("--max-dim", type=int, default=settings.MAX_IMAGE_DIM,
+                        help="size limit applied before OCR, as for uploads")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per image, fastest counts")
+    args = parser.parse_args()
+
+    samples = load_samples(args.gt_dir, args.limit)
+    if not samples:
+        raise SystemExit(f"No reference cards found in {args.gt_dir}")
+    catalogue = [(name, text) for name, text, _ in samples]
+
+    stats = benchmark(samples, catalogue, args.max_dim, args.repeat)
+
+    print(f"{len(samples)} cards, max dim {args.max_dim}")
+    print(f"{'mode':<14} {'mean ms':>9} {'p95 ms':>9} {'text score':>11} {'top-1':>7}")
+    for mode, result in stats.items():
+        times = sorted(result["times"])
+        p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+        print(
+            f"{mode:<14} {statistics.mean(times) * 1000:>9.1f} {p95 * 1000:>9.1f} "
+            f"{statistics.mean(result['scores']):>11.3f} {result['hits'] / len(samples):>7.1%}"
+        )
+
+    current, preprocessed = stats["current"], stats["preprocessed"]
+    speedup = statistics.mean(current["times"]) / statistics.mean(preprocessed["times"])
+    print(f"preprocessing speedup: {speedup:.2f}x")
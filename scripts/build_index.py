@@ -0,0 +1,34 @@
+import argparse
+from pathlib import Path
+
+from src.the_way_recognition.core.index import CardIndex
+from src.the_way_recognition.core.snapshot import load_index, save_index
+from src.the_way_recognition.db.database import ReadSession
+from src.the_way_recognition.db.repositories.card_repository import \
+    CardRepository
+
+DEFAULT_OUTPUT = Path("data") / "index" / "cards.twidx"
+
+
+def build_index(output: Path) -> dict:
+    with ReadSession() as session:
+        repo = CardRepository(session)
+        index = CardIndex.from_cards(repo.get_index_rows(), repo.get_version())
+    header = save_index(index, output)
+
+    # Fail the build rather than ship an artifact the service cannot load
+    load_index(output, verify=True)
+    return header
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a portable card index artifact")
+    parser.add_argument("output", nargs="?", type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    header = build_index(args.output)
+    print(f"Wrote {args.output}")
+    print(f"  catalogue version: {header['version']}")
+    print(f"  cards:             {len(header['cards'])}")
+    print(f"  model:             {header['model']}")
+    print(f"  sha256:            {header['checksum']}")
@@ -2,14 +2,15 @@ import json
 from pathlib import Path
 
 import numpy as np
+from PIL import Image
 
-from src.the_way_recognition.db.database import SessionLocal, engine
-from src.the_way_recognition.db.models import Card, Base
+from src.the_way_recognition.core.hashing import compute_phash, hash_to_hex
+from src.the_way_recognition.db.database import bulk_write_session, init_db
 from src.the_way_recognition.db.repositories.card_repository import \
     CardRepository
 from src.the_way_recognition.utils.json_to_text import card_json_to_text
 
-Base.metadata.create_all(bind=engine)
+init_db()
 
 
 def load_embedding(path):
@@ -17,7 +18,14 @@ def load_embedding(path):
     return arr.tobytes()
 
 
-def insert_card(json_path, embedding_path, repo: CardRepository):
+def load_hash(path):
+    if not path.exists():
+        return None
+    with Image.open(path) as img:
+        return hash_to_hex(compute_phash(img))
+
+
+def load_card(json_path, embedding_path, png_path) -> dict:
     with open(json_path, 'r', encoding='utf-8') as f:
         card_data = json.load(f)
     name = card_data.get('name', '')
@@ -25,14 +33,15 @@ def insert_card(json_path, embedding_path, repo: CardRepository):
     rarity = card_data.get('rarity', '')
     gt_text = card_json_to_text(json_path)
     gt_embedding = load_embedding(embedding_path)
-    card = Card(
+    gt_hash = load_hash(png_path)
+    return dict(
         name=name,
         edition=edition,
         rarity=rarity,
         gt_text=gt_text,
         gt_embedding=gt_embedding,
+        gt_hash=gt_hash,
     )
-    repo.create(card)
 
 
 if __name__ == "__main__":
@@ -40,10 +49,15 @@ if __name__ == "__main__":
     gt_path = 'data/gt/'
     npy_path = Path(gt_path) / "npy"
     json_path = Path(gt_path) / "json"
-    with SessionLocal() as session:
+    png_path = Path(gt_path) / "png"
+    with bulk_write_session() as session:
         repo = CardRepository(session)
+        cards = []
         for filename in json_path.iterdir():
             if filename.suffix == '.json':
                 json_file = filename
                 emb_file = npy_path / filename.with_suffix('.npy').name
-                insert_card(json_file, emb_file, repo)
+                png_file = png_path / filename.with_suffix('.png').name
+                cards.append(load_card(json_file, emb_file, png_file))
+        # One transaction and one executemany for the whole catalogue
+        repo.bulk_insert(cards)
@@ -0,0 +1,314 @@
+"""
+Load generator for the recognition API.
+
+Replays a directory of card images against a running service, or against the
+app in-process with stubbed OCR and CLIP, either with a fixed number of
+concurrent clients (closed loop) or at a fixed arrival rate (open loop).
+Several levels can be given to get a saturation curve:
+
+    uv run -m scripts.load_test data/ --concurrency 1,2,4,8,16 --duration 30
+    uv run -m scripts.load_test data/ --rate 5,10,20 --in-process --json results.json
+
+Per-stage times come from the Server-Timing header, which the service sends
+when PROFILING_ENABLED is set (always on for --in-process).
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+from PIL import Image
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+STUB_TEXT = "STUB CARD TEXT"
+
+
+def load_images(directory: Path) -> List[tuple]:
+    paths = sorted(p for p in directory.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    return [(path.name, path.read_bytes()) for path in paths]
+
+
+def parse_levels(value: str) -> List[float]:
+    return [float(level) for level in value.split(",") if level.strip()]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest rank
+    rank = max(0, min(len(sorted_values) - 1, int(np.ceil(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    stages = {}
+    for entry in (header or "").split(","):
+        name, *params = [part.strip() for part in entry.split(";")]
+        for param in params:
+            if name and param.startswith("dur="):
+                stages[name] = float(param[4:])
+    return stages
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.degradation: Counter = Counter()
+        self.stages: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+
+    def record(self, latency: float, response: Optional[httpx.Response], error: Optional[str]):
+        if error is not None:
+            self.errors[error] += 1
+            self.statuses["error"] += 1
+            return
+
+        self.statuses[response.status_code] += 1
+        if response.status_code == 200:
+            self.latencies.append(latency)
+        if "x-degradation" in response.headers:
+            self.degradation[response.headers["x-degradation"]] += 1
+        for name, ms in parse_server_timing(response.headers.get("server-timing")).items():
+            self.stages[name].append(ms)
+
+    def summary(self, elapsed: float) -> dict:
+        total = sum(self.statuses.values())
+        ok = self.statuses.get(200, 0)
+        latencies = sorted(self.latencies)
+        return {
+            "requests": total,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round((total - ok) / total, 4) if total else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 1),
+                "p95": round(percentile(latencies, 95) * 1000, 1),
+                "p99": round(percentile(latencies, 99) * 1000, 1),
+                "mean": round(statistics.mean(latencies) * 1000, 1) if latencies else 0.0,
+            },
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "degradation": dict(self.degradation),
+            "errors": dict(self.errors),
+            "stages_ms": {
+                name: {
+                    "mean": round(statistics.mean(values), 1),
+                    "p95": round(percentile(sorted(values), 95), 1),
+                }
+                for name, values in self.stages.items()
+            },
+        }
+
+
+async def send(client: httpx.AsyncClient, endpoint: str, image: tuple, recorder: Recorder):
+    filename, data = image
+    start = time.perf_counter()
+    try:
+        response = await client.post(endpoint, files={"file": (filename, data)})
+    except httpx.HTTPError as e:
+        recorder.record(time.perf_counter() - start, None, type(e).__name__)
+        return
+    recorder.record(time.perf_counter() - start, response, None)
+
+
+async def run_closed_loop(client, endpoint, images, concurrency: int, duration: float, requests: int):
+    """concurrency clients, each sends its next request when the previous one returns."""
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+    counter = iter(range(requests or 10 ** 12))
+
+    async def client_loop():
+        for i in counter:
+            if time.perf_counter() >= deadline:
+                return
+            await send(client, endpoint, images[i % len(images)], recorder)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return recorder.summary(time.perf_counter() - start)
+
+
+async def run_open_loop(client, endpoint, images, rate: float, duration: float, requests: int):
+    """Requests arrive every 1/rate seconds, whether earlier ones have finished or not."""
+    recorder = Recorder()
+    total = requests or max(1, int(rate * duration))
+    tasks = []
+
+    start = time.perf_counter()
+    for i in range(total):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(client, endpoint, images[i % len(images)], recorder)))
+    await asyncio.gather(*tasks)
+    return recorder.summary(time.perf_counter() - start)
+
+
+def build_in_process_app(images: List[tuple], ocr_latency: float, embedding_latency: float,
+                         hash_matches: bool):
+    """The real app with OCR and CLIP replaced by stubs and an index built from the images."""
+    # Settings are read on import, so configure before the app is loaded
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    os.environ.update({
+        "PROFILING_ENABLED": "true",
+        "DATABASE_URL": f"sqlite:///{workdir}/cards.db",
+        "JOBS_DATABASE_URL": f"sqlite:///{workdir}/jobs.db",
+        "JOBS_DIR": f"{workdir}/jobs",
+        "CAPTURE_DIR": f"{workdir}/captures",
+        "JOB_WORKERS": "0",
+        "CATALOGUE_REFRESH_INTERVAL": "0",
+    })
+
+    from src.main import app
+    from src.the_way_recognition import dependencies
+    from src.the_way_recognition.config import settings
+    from src.the_way_recognition.core.hashing import compute_phash, hash_to_hex
+    from src.the_way_recognition.core.index import CardIndex, CardRecord, IndexHolder
+    from src.the_way_recognition.core.ocr import OCRService
+    from src.the_way_recognition.utils.image import decode_image
+
+    def stub_vector(image: Image.Image) -> np.ndarray:
+        # Deterministic 512-d vector from a thumbnail, similar images stay similar
+        pixels = np.asarray(image.convert("L").resize((16, 32)), dtype=np.float32).flatten()
+        return pixels - pixels.mean() + 1e-3
+
+    class StubEmbeddingService:
+        def __init__(self):
+            self._slots = threading.BoundedSemaphore(settings.EMBEDDING_CONCURRENCY)
+
+        def encode_image(self, image: Image.Image) -> np.ndarray:
+            return self.encode_images([image])[0]
+
+        def encode_images(self, images: List[Image.Image]) -> np.ndarray:
+            with self._slots:
+                time.sleep(embedding_latency * len(images))
+            return np.stack([stub_vector(image) for image in images])
+
+    class StubOCRService(OCRService):
+        @staticmethod
+        def extract_text(image: Image.Image, preprocess: Optional[bool] = None) -> str:
+            time.sleep(ocr_latency)
+            return STUB_TEXT
+
+    decoded = [decode_image(data) for _, data in images]
+    cards = [
+        CardRecord(
+            name=Path(filename).stem,
+            gt_text=STUB_TEXT,
+            gt_hash=hash_to_hex(compute_phash(image)) if hash_matches else None,
+        )
+        for (filename, _), image in zip(images, decoded)
+    ]
+    matrix = np.stack([stub_vector(image) for image in decoded])
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    index = CardIndex(cards, (matrix, np.ones(len(cards), dtype=bool)))
+    holder = IndexHolder(lambda: index.version, lambda: index)
+
+    embedding_service, ocr_service = StubEmbeddingService(), StubOCRService()
+    app.dependency_overrides[dependencies.get_embedding_service] = lambda: embedding_service
+    app.dependency_overrides[dependencies.get_ocr_service] = lambda: ocr_service
+    app.dependency_overrides[dependencies.get_index_holder] = lambda: holder
+    return app
+
+
+def print_summary(mode: str, level: float, summary: dict):
+    latency = summary["latency_ms"]
+    print(
+        f"{f'{mode}={level:g}':<18} {summary['requests']:>8} {summary['throughput_rps']:>9.2f} "
+        f"{latency['p50']:>8.1f} {latency['p95']:>8.1f} {latency['p99']:>8.1f} "
+        f"{summary['error_rate']:>7.1%}  {summary['degradation'] or ''}"
+    )
+    if summary["stages_ms"]:
+        stages = ", ".join(
+            f"{name} {values['mean']:.1f}/{values['p95']:.1f}"
+            for name, values in summary["stages_ms"].items()
+        )
+        print(f"    stages mean/p95 ms: {stages}")
+    if summary["errors"]:
+        print(f"    errors: {summary['errors']}")
+
+
+async def main(args) -> List[dict]:
+    images = load_images(args.images)
+    if not images:
+        raise SystemExit(f"No images found in {args.images}")
+
+    if args.in_process:
+        app = build_in_process_app(
+            images, args.stub_ocr_latency, args.stub_embedding_latency, args.stub_hash_matches
+        )
+        transport, base_url = httpx.ASGITransport(app=app), "http://load-test"
+    else:
+        transport, base_url = None, args.url
+
+    mode = "rate" if args.rate else "concurrency"
+    levels = parse_levels(args.rate or args.concurrency)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    results = []
+
+    async with httpx.AsyncClient(
+        base_url=base_url, transport=transport, timeout=args.timeout, limits=limits
+    ) as client:
+        if args.warmup:
+            await run_closed_loop(client, args.endpoint, images, 1, float("inf"), args.warmup)
+
+        per_level = f"{args.requests} requests" if args.requests else f"{args.duration:g}s"
+        print(f"{len(images)} images, {args.endpoint}, {per_level} per level")
+        print(f"{'level':<18} {'requests':>8} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'errors':>7}  degradation")
+        for level in levels:
+            if mode == "rate":
+                summary = await run_open_loop(
+                    client, args.endpoint, images, level, args.duration, args.requests
+                )
+            else:
+                summary = await run_closed_loop(
+                    client, args.endpoint, images, int(level), args.duration, args.requests
+                )
+            summary[mode] = level
+            results.append(summary)
+            print_summary(mode, level, summary)
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Replay card images against the recognition API and report latency and throughput"
+    )
+    parser.add_argument("images", type=Path, help="directory of card images")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", default="/api/v1/recognize-card")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", default="4",
+                      help="concurrent clients, comma separated for several levels")
+    load.add_argument("--rate", help="requests per second, comma separated for several levels")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per level")
+    parser.add_argument("--requests", type=int, default=0,
+                        help="requests per level instead of --duration")
+    parser.add_argument("--warmup", type=int, default=5, help="sequential requests before measuring")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", type=Path, help="write the results to this file")
+    parser.add_argument("--in-process", action="store_true",
+                        help="run the app in this process with stubbed OCR and CLIP")
+    parser.add_argument("--stub-ocr-latency", type=float, default=0.15, help="seconds per OCR call")
+    parser.add_argument("--stub-embedding-latency", type=float, default=0.05,
+                        help="seconds per encoded image")
+    parser.add_argument("--stub-hash-matches", action="store_true",
+                        help="index the hashes of the images, so requests take the hash fast path")
+    args = parser.parse_args()
+    if args.requests:
+        args.duration = float("inf")
+
+    results = asyncio.run(main(args))
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
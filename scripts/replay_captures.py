@@ -0,0 +1,117 @@
+import argparse
+import cProfile
+import json
+import pstats
+import time
+from pathlib import Path
+
+from src.the_way_recognition.api.schemas.card import FeatureRecognitionRequest
+from src.the_way_recognition.config import settings
+from src.the_way_recognition.core import profiling
+from src.the_way_recognition.core.detection import CardDetector
+from src.the_way_recognition.core.index import CardFilter
+from src.the_way_recognition.core.matching import CardMatcher
+from src.the_way_recognition.core.overload import Degradation
+from src.the_way_recognition.core.pipeline import RecognitionPipeline
+from src.the_way_recognition.dependencies import (
+    get_embedding_service,
+    get_index_holder,
+    get_ocr_service
+)
+from src.the_way_recognition.utils.image import decode_image
+
+
+def find_captures(paths):
+    for path in paths:
+        path = Path(path)
+        if (path / "request.json").exists():
+            yield path
+        else:
+            yield from sorted(p.parent for p in path.glob("*/request.json"))
+
+
+def replay(pipeline: RecognitionPipeline, capture: Path, record: dict):
+    """Run the captured request through the pipeline, returns the matched names."""
+    params = record["params"]
+    inputs = [(capture / item["file"]).read_bytes() for item in record["inputs"]]
+    card_filter = CardFilter(
+        **{field: tuple(values) for field, values in params.get("card_filter", {}).items()}
+    )
+    degradation = Degradation[params.get("degradation", "none").upper()]
+
+    if record["path"].endswith("/recognize-features"):
+        request = FeatureRecognitionRequest.model_validate_json(inputs[0])
+        result = pipeline.recognize_features(
+            request.ocr_text, request.query_embedding(), degradation, request.card_filter()
+        )
+        return [result]
+
+    if record["path"].endswith("/recognize-cards"):
+        with profiling.stage("decode"):
+            image = decode_image(inputs[0], settings.MULTI_CARD_MAX_IMAGE_DIM)
+        with profiling.stage("detection"):
+            crops = [crop for _, crop in CardDetector().crop_cards(image)]
+        return pipeline.recognize_batch(crops, degradation, card_filter)
+
+    if record["path"].endswith("/recognize-card"):
+        with profiling.stage("decode"):
+            image = decode_image(inputs[0])
+        return [pipeline.recognize(image, degradation, card_filter)]
+
+    raise ValueError(f"Cannot replay requests to {record['path']}")
+
+
+def print_stages(captured: dict, replayed: dict):
+    print(f"    {'stage':<12} {'captured ms':>12} {'replay ms':>12}")
+    for name in dict.fromkeys([*captured, *replayed]):
+        before = f"{captured[name] * 1000:.1f}" if name in captured else "-"
+        after = f"{replayed[name] * 1000:.1f}" if name in replayed else "-"
+        print(f"    {name:<12} {before:>12} {after:>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Replay captured slow or profiled requests offline against the pipeline"
+    )
+    parser.add_argument(
+        "captures", nargs="*", default=[settings.CAPTURE_DIR],
+        help="capture directories, or directories containing them"
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="runs per capture")
+    parser.add_argument("--profile", action="store_true", help="print a CPU profile of each run")
+    parser.add_argument("--top", type=int, default=25, help="functions shown with --profile")
+    args = parser.parse_args()
+
+    pipeline = RecognitionPipeline(
+        get_ocr_service(),
+        CardMatcher(get_embedding_service()),
+        get_index_holder().current,
+    )
+
+    for capture in find_captures(args.captures):
+        record = json.loads((capture / "request.json").read_text())
+        print(f"{capture.name}  {record['path']}  captured {record['duration'] * 1000:.1f} ms")
+
+        for run in range(args.repeat):
+            profile = profiling.RequestProfile()
+            cpu_profile = cProfile.Profile() if args.profile else None
+            token = profiling.activate(profile)
+            start = time.perf_counter()
+            try:
+                if cpu_profile:
+                    cpu_profile.enable()
+                results = replay(pipeline, capture, record)
+            except ValueError as e:
+                print(f"  skipped: {e}")
+                break
+            finally:
+                if cpu_profile:
+                    cpu_profile.disable()
+                profiling.deactivate(token)
+            total = time.perf_counter() - start
+
+            names = [result.card.name if result.card else None for result in results]
+            print(f"  run {run + 1}: {total * 1000:.1f} ms -> {names}")
+            print_stages(record["stages"], profile.stages)
+            if cpu_profile:
+                pstats.Stats(cpu_profile).sort_stats("cumulative").print_stats(args.top)
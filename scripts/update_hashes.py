@@ -0,0 +1,34 @@
+import json
+from pathlib import Path
+
+from PIL import Image
+
+from src.the_way_recognition.core.hashing import compute_phash, hash_to_hex
+from src.the_way_recognition.db.database import bulk_write_session, init_db
+from src.the_way_recognition.db.repositories.card_repository import \
+    CardRepository
+
+init_db()
+
+
+if __name__ == "__main__":
+
+    gt_path = 'data/gt/'
+    png_path = Path(gt_path) / "png"
+    json_path = Path(gt_path) / "json"
+    with bulk_write_session() as session:
+        repo = CardRepository(session)
+        updates = []
+        for filename in json_path.iterdir():
+            png_file = png_path / filename.with_suffix('.png').name
+            if filename.suffix != '.json' or not png_file.exists():
+                continue
+            with open(filename, 'r', encoding='utf-8') as f:
+                name = json.load(f).get('name', '')
+            card = repo.get_by_name(name)
+            if card is None:
+                print(f"Card {name} not found, skipping")
+                continue
+            with Image.open(png_file) as img:
+                updates.append({"name": card.name, "gt_hash": hash_to_hex(compute_phash(img))})
+        repo.bulk_update(updates)
@@ -1,13 +1,63 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from src.the_way_recognition.config import settings
-from src.the_way_recognition.api.routes import recognition
-from src.the_way_recognition.db.database import engine, Base
+from src.the_way_recognition.api.middleware import ProfilingMiddleware
+from src.the_way_recognition.api.routes import catalogue, jobs, recognition
+from src.the_way_recognition.dependencies import get_index_holder, load_catalogue_version
+from src.the_way_recognition.db.database import init_db
+from src.the_way_recognition.jobs.store import init_jobs_db
+from src.the_way_recognition.jobs.worker import WorkerPool
+
+logger = logging.getLogger(__name__)
+
+init_db()
+init_jobs_db()
+
+
+async def refresh_catalogue(interval: float):
+    # Picks up changes made by other replicas or the ingestion scripts
+    holder = get_index_holder()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # The version check runs on the event loop without blocking it,
+            # only an actual rebuild goes to a thread
+            if not settings.INDEX_ARTIFACT_PATH and holder.is_current(
+                await load_catalogue_version()
+            ):
+                continue
+            await run_in_threadpool(holder.refresh)
+        except Exception:
+            logger.exception("Catalogue refresh failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bulk job workers run as separate low-priority processes
+    worker_pool = WorkerPool(settings.JOB_WORKERS)
+    worker_pool.start()
+
+    refresh_task = None
+    if settings.CATALOGUE_REFRESH_INTERVAL > 0:
+        refresh_task = asyncio.create_task(
+            refresh_catalogue(settings.CATALOGUE_REFRESH_INTERVAL)
+        )
+    try:
+        yield
+    finally:
+        if refresh_task:
+            refresh_task.cancel()
+        worker_pool.stop()
 
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
-    title=settings.PROJECT_NAME, openapi_url=f"{settings.API_V1_PREFIX}/openapi.json"
+    title=settings.PROJECT_NAME,
+    openapi_url=f"{settings.API_V1_PREFIX}/openapi.json",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -19,8 +69,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in, adds stage timings, CPU profiles and slow request capture
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 # Include routers
 app.include_router(recognition.router)
+app.include_router(jobs.router)
+app.include_router(catalogue.router)
 
 
 @app.get("/")
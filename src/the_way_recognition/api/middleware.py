@@ -0,0 +1,77 @@
+import logging
+import os
+import random
+import secrets
+import shutil
+import time
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware
+from src.the_way_recognition.config import settings
+from src.the_way_recognition.core import profiling
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    """
+    Records stage timings of every request into a Server-Timing header.
+    Sampled or header-triggered requests also get a CPU profile; those and
+    requests slower than SLOW_REQUEST_THRESHOLD are saved to CAPTURE_DIR.
+    """
+
+    @staticmethod
+    def _cpu_requested(request: Request) -> bool:
+        value = request.headers.get(settings.PROFILING_HEADER)
+        if value is not None:
+            # Profiling is expensive, only holders of the admin token may ask for it
+            # Bytes, compare_digest rejects str with non-ASCII characters
+            return bool(settings.ADMIN_TOKEN) and secrets.compare_digest(
+                value.encode(), settings.ADMIN_TOKEN.encode()
+            )
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    @staticmethod
+    def _evict_captures() -> None:
+        # Capture names start with their timestamp, the oldest go first to
+        # make room for the one about to be saved
+        try:
+            captures = sorted(os.listdir(settings.CAPTURE_DIR))
+        except FileNotFoundError:
+            return
+        for name in captures[:max(0, len(captures) - settings.CAPTURE_MAX_REQUESTS + 1)]:
+            shutil.rmtree(os.path.join(settings.CAPTURE_DIR, name), ignore_errors=True)
+
+    async def dispatch(self, request: Request, call_next):
+        profile = profiling.RequestProfile(cpu=self._cpu_requested(request))
+        token = profiling.activate(profile)
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            profiling.deactivate(token)
+        total = time.perf_counter() - start
+
+        response.headers["Server-Timing"] = profile.server_timing(total)
+
+        # Only requests that went through the pipeline are worth replaying
+        slow = 0 < settings.SLOW_REQUEST_THRESHOLD <= total
+        if (profile.cpu_profiled or slow) and (profile.stages or profile.inputs):
+            record = {
+                "method": request.method,
+                "path": request.url.path,
+                "query": str(request.url.query),
+                "status": response.status_code,
+                "duration": round(total, 6),
+                "reason": "slow" if slow else "profiled",
+                "catalogue_version": response.headers.get("X-Catalogue-Version"),
+                "degradation": response.headers.get("X-Degradation"),
+            }
+            try:
+                await run_in_threadpool(self._evict_captures)
+                await run_in_threadpool(profile.save, settings.CAPTURE_DIR, record)
+                response.headers["X-Profile-Id"] = profile.id
+            except OSError:
+                logger.exception("Could not save request capture %s", profile.id)
+
+        return response
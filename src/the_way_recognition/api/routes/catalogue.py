@@ -0,0 +1,187 @@
+from typing import Optional, Tuple
+import numpy as np
+from fastapi import (
+    APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
+)
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image
+from src.the_way_recognition.api.schemas.catalogue import (
+    CatalogueUpdateResponse,
+    CatalogueVersionResponse
+)
+from src.the_way_recognition.core.embeddings import EmbeddingService
+from src.the_way_recognition.core.hashing import compute_phash, hash_to_hex
+from src.the_way_recognition.core.index import IndexHolder
+from src.the_way_recognition.db.models import Card
+from src.the_way_recognition.db.repositories.card_repository import CardRepository
+from src.the_way_recognition.utils.image import preprocess_image
+from src.the_way_recognition.utils.json_to_text import card_to_text
+from src.the_way_recognition.dependencies import (
+    get_card_repository,
+    get_embedding_service,
+    get_index_holder,
+    require_admin,
+    require_writable_catalogue
+)
+from src.the_way_recognition.config import settings
+
+router = APIRouter(prefix=f"{settings.API_V1_PREFIX}/catalogue", tags=["catalogue"])
+
+
+def _reference_features(
+    image: Image.Image, embedding_service: EmbeddingService
+) -> Tuple[bytes, str]:
+    # Stored the same way as scripts/get_embeddings.py: unit length float32
+    embedding = embedding_service.encode_image(image).astype(np.float32)
+    embedding /= np.linalg.norm(embedding)
+    return embedding.tobytes(), hash_to_hex(compute_phash(image))
+
+
+def _card_text(
+    name: str,
+    rarity: Optional[str],
+    text: Optional[str],
+    description: Optional[str],
+    index: Optional[str],
+    footer: Optional[str],
+) -> Optional[str]:
+    if text:
+        return text
+    if not any((description, index, footer)):
+        return None
+    return card_to_text({
+        "name": name,
+        "description": description or "",
+        "index": index or "",
+        "rarity": rarity or "",
+        "footer": footer or "",
+    })
+
+
+async def _read_image(file: UploadFile) -> Image.Image:
+    try:
+        return await preprocess_image(file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("", response_model=CatalogueVersionResponse)
+def get_catalogue_version(holder: IndexHolder = Depends(get_index_holder)):
+    index = holder.current
+    return CatalogueVersionResponse(version=index.version, cards=len(index))
+
+
+@router.post(
+    "/cards",
+    response_model=CatalogueUpdateResponse,
+    status_code=201,
+    dependencies=[Depends(require_admin), Depends(require_writable_catalogue)],
+)
+async def create_card(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    name: str = Form(...),
+    edition: Optional[str] = Form(None),
+    rarity: Optional[str] = Form(None),
+    text: Optional[str] = Form(None),
+    description: Optional[str] = Form(None),
+    index: Optional[str] = Form(None),
+    footer: Optional[str] = Form(None),
+    card_repo: CardRepository = Depends(get_card_repository),
+    embedding_service: EmbeddingService = Depends(get_embedding_service),
+    holder: IndexHolder = Depends(get_index_holder)
+):
+    # Blocking session calls run in a thread, off the event loop
+    if await run_in_threadpool(card_repo.get_by_name, name):
+        raise HTTPException(status_code=409, detail=f"Card {name} already exists")
+
+    gt_text = _card_text(name, rarity, text, description, index, footer)
+    if gt_text is None:
+        raise HTTPException(status_code=400, detail="Card text is required")
+
+    image = await _read_image(file)
+    gt_embedding, gt_hash = await run_in_threadpool(
+        _reference_features, image, embedding_service
+    )
+
+    await run_in_threadpool(card_repo.create, Card(
+        name=name,
+        edition=edition,
+        rarity=rarity,
+        gt_text=gt_text,
+        gt_embedding=gt_embedding,
+        gt_hash=gt_hash,
+    ))
+
+    # The new snapshot is built after the response, requests keep the old one until then
+    background_tasks.add_task(holder.refresh)
+    version = await run_in_threadpool(card_repo.get_version)
+    return CatalogueUpdateResponse(name=name, version=version)
+
+
+@router.put(
+    "/cards/{name}",
+    response_model=CatalogueUpdateResponse,
+    dependencies=[Depends(require_admin), Depends(require_writable_catalogue)],
+)
+async def update_card(
+    name: str,
+    background_tasks: BackgroundTasks,
+    file: Optional[UploadFile] = File(None),
+    edition: Optional[str] = Form(None),
+    rarity: Optional[str] = Form(None),
+    text: Optional[str] = Form(None),
+    description: Optional[str] = Form(None),
+    index: Optional[str] = Form(None),
+    footer: Optional[str] = Form(None),
+    card_repo: CardRepository = Depends(get_card_repository),
+    embedding_service: EmbeddingService = Depends(get_embedding_service),
+    holder: IndexHolder = Depends(get_index_holder)
+):
+    card = await run_in_threadpool(card_repo.get_by_name, name)
+    if not card:
+        raise HTTPException(status_code=404, detail=f"Card {name} not found")
+
+    gt_text = _card_text(name, rarity or card.rarity, text, description, index, footer)
+    # The rarity is part of the card text, which is only stored as a whole
+    if rarity is not None and rarity != card.rarity and gt_text is None:
+        raise HTTPException(
+            status_code=400, detail="Changing the rarity requires the card text as well"
+        )
+
+    if edition is not None:
+        card.edition = edition
+    if rarity is not None:
+        card.rarity = rarity
+    if gt_text is not None:
+        card.gt_text = gt_text
+
+    if file is not None:
+        image = await _read_image(file)
+        card.gt_embedding, card.gt_hash = await run_in_threadpool(
+            _reference_features, image, embedding_service
+        )
+
+    await run_in_threadpool(card_repo.update, card)
+    background_tasks.add_task(holder.refresh)
+    version = await run_in_threadpool(card_repo.get_version)
+    return CatalogueUpdateResponse(name=name, version=version)
+
+
+@router.delete(
+    "/cards/{name}",
+    response_model=CatalogueUpdateResponse,
+    dependencies=[Depends(require_admin), Depends(require_writable_catalogue)],
+)
+async def delete_card(
+    name: str,
+    background_tasks: BackgroundTasks,
+    card_repo: CardRepository = Depends(get_card_repository),
+    holder: IndexHolder = Depends(get_index_holder)
+):
+    if not await run_in_threadpool(card_repo.delete, name):
+        raise HTTPException(status_code=404, detail=f"Card {name} not found")
+
+    background_tasks.add_task(holder.refresh)
+    version = await run_in_threadpool(card_repo.get_version)
+    return CatalogueUpdateResponse(name=name, version=version)
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import shutil
+import uuid
+import zipfile
+from pathlib import Path
+from typing import AsyncIterator, List, Tuple
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from src.the_way_recognition.api.schemas.job import JobProgress, JobResponse
+from src.the_way_recognition.jobs.store import COMPLETED, Job, JobStore
+from src.the_way_recognition.dependencies import get_job_store
+from src.the_way_recognition.config import settings
+
+router = APIRouter(prefix=f"{settings.API_V1_PREFIX}/jobs", tags=["jobs"])
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def _job_response(job: Job, store: JobStore) -> JobResponse:
+    return JobResponse(
+        job_id=job.id,
+        status=job.status,
+        total=job.total,
+        progress=JobProgress(**store.count_by_status(job.id)),
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+    )
+
+
+def _save_uploads(files: List[UploadFile], job_dir: Path) -> List[tuple]:
+    saved = []
+
+    def target(name: str) -> Path:
+        if len(saved) >= settings.JOB_MAX_ITEMS:
+            raise ValueError(f"Too many images, at most {settings.JOB_MAX_ITEMS} per job")
+        # Never trust names from the upload or the archive for the stored path
+        return job_dir / f"{len(saved)}{Path(name).suffix.lower()}"
+
+    for upload in files:
+        filename = upload.filename or ""
+        if filename.lower().endswith(".zip"):
+            try:
+                archive = zipfile.ZipFile(upload.file)
+            except zipfile.BadZipFile as e:
+                raise ValueError(f"Invalid archive {filename}: {str(e)}")
+            with archive:
+                for entry in sorted(archive.infolist(), key=lambda entry: entry.filename):
+                    if entry.is_dir() or Path(entry.filename).suffix.lower() not in IMAGE_SUFFIXES:
+                        continue
+                    path = target(entry.filename)
+                    with archive.open(entry) as src, open(path, "wb") as dst:
+                        shutil.copyfileobj(src, dst)
+                    saved.append((entry.filename, str(path)))
+        else:
+            path = target(filename)
+            with open(path, "wb") as dst:
+                shutil.copyfileobj(upload.file, dst)
+            saved.append((filename, str(path)))
+
+    return saved
+
+
+@router.post("", response_model=JobResponse, status_code=202)
+def create_job(
+    files: List[UploadFile] = File(...),
+    store: JobStore = Depends(get_job_store)
+):
+    job_id = uuid.uuid4().hex
+    job_dir = Path(settings.JOBS_DIR) / job_id
+    job_dir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        saved = _save_uploads(files, job_dir)
+        if not saved:
+            raise ValueError("No images found in upload")
+    except ValueError as e:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = store.create_job(job_id, saved)
+    return _job_response(job, store)
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(job_id: str, store: JobStore = Depends(get_job_store)):
+    job = store.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_response(job, store)
+
+
+@router.get("/{job_id}/results")
+def get_job_results(
+    job_id: str,
+    follow: bool = False,
+    store: JobStore = Depends(get_job_store)
+):
+    job = store.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    def poll(stream_store: JobStore, position: int) -> Tuple[List[str], int, bool]:
+        lines = []
+        for item in stream_store.iter_finished(job_id, position):
+            if item.position != position + 1:
+                break
+            position = item.position
+            lines.append(json.dumps(item.to_record()) + "\n")
+
+        stream_store.session.expire_all()
+        current = stream_store.get_job(job_id)
+        done = (
+            not follow
+            or current is None
+            or (current.status == COMPLETED and position + 1 >= current.total)
+        )
+        return lines, position, done
+
+    async def stream() -> AsyncIterator[str]:
+        # Results are emitted in submission order, with follow=true the stream
+        # stays open until every item has finished. Only the queries take a
+        # thread, waiting between polls does not
+        stream_store = JobStore()
+        position = -1
+        try:
+            while True:
+                lines, position, done = await run_in_threadpool(poll, stream_store, position)
+                for line in lines:
+                    yield line
+                if done:
+                    return
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+        finally:
+            await run_in_threadpool(stream_store.close)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.delete("/{job_id}", status_code=204)
+def delete_job(job_id: str, store: JobStore = Depends(get_job_store)):
+    if not store.delete_job(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    shutil.rmtree(Path(settings.JOBS_DIR) / job_id, ignore_errors=True)
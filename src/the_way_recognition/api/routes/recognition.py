@@ -1,57 +1,114 @@
+from dataclasses import asdict
 from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
-from src.the_way_recognition.api.schemas.card import CardRecognitionResponse
-from src.the_way_recognition.core.ocr import OCRService
-from src.the_way_recognition.core.matching import CardMatcher
-from src.the_way_recognition.db.repositories.card_repository import CardRepository
+from fastapi.concurrency import run_in_threadpool
+from src.the_way_recognition.api.schemas.card import (
+    CardRecognitionResponse,
+    DetectedCard,
+    FeatureRecognitionRequest,
+    MultiCardRecognitionResponse
+)
+from src.the_way_recognition.core import profiling
+from src.the_way_recognition.core.detection import CardDetector
+from src.the_way_recognition.core.index import CardFilter
+from src.the_way_recognition.core.overload import Degradation
+from src.the_way_recognition.core.pipeline import EmptyCatalogueError, RecognitionPipeline
 from src.the_way_recognition.utils.image import preprocess_image
 from src.the_way_recognition.dependencies import (
-    get_ocr_service,
-    get_card_matcher,
-    get_card_repository
+    admit_request,
+    get_card_detector,
+    get_card_filter,
+    get_recognition_pipeline
 )
 from src.the_way_recognition.config import settings
 
 router = APIRouter(prefix=settings.API_V1_PREFIX, tags=["recognition"])
 
+
 @router.post("/recognize-card", response_model=CardRecognitionResponse)
 async def recognize_card(
     file: UploadFile = File(...),
-    ocr_service: OCRService = Depends(get_ocr_service),
-    card_matcher: CardMatcher = Depends(get_card_matcher),
-    card_repo: CardRepository = Depends(get_card_repository)
+    card_filter: CardFilter = Depends(get_card_filter),
+    pipeline: RecognitionPipeline = Depends(get_recognition_pipeline),
+    degradation: Degradation = Depends(admit_request)
 ):
     try:
         image = await preprocess_image(file)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    profiling.annotate(degradation=degradation.label, card_filter=asdict(card_filter))
+
+    try:
+        # Off the event loop, so in-flight requests and stage queues are observable
+        result = await run_in_threadpool(
+            profiling.call, pipeline.recognize, image, degradation, card_filter
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except EmptyCatalogueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return CardRecognitionResponse.from_result(result)
+
 
-    # Extract text using OCR
-    ocr_text = ocr_service.extract_text(image)
+@router.post("/recognize-features", response_model=CardRecognitionResponse)
+async def recognize_features(
+    request: FeatureRecognitionRequest,
+    pipeline: RecognitionPipeline = Depends(get_recognition_pipeline),
+    degradation: Degradation = Depends(admit_request)
+):
+    # Only the index lookup runs here, so there is nothing to degrade - the
+    # request is still admitted so overload shedding applies to it too, and
+    # the body reports the same level as the X-Degradation header
+    profiling.record_input("features.json", request.model_dump_json().encode("utf-8"))
+    try:
+        result = await run_in_threadpool(
+            profiling.call,
+            pipeline.recognize_features,
+            request.ocr_text,
+            request.query_embedding(),
+            degradation,
+            request.card_filter(),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except EmptyCatalogueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-    # Get all cards from database
-    cards = card_repo.get_all()
+    return CardRecognitionResponse.from_result(result)
 
-    if not cards:
-        raise HTTPException(status_code=500, detail="No cards found in database")
 
-    # Find best text match
-    best_text_card, best_text_score = card_matcher.get_best_text_match(ocr_text, cards)
+@router.post("/recognize-cards", response_model=MultiCardRecognitionResponse)
+async def recognize_cards(
+    file: UploadFile = File(...),
+    detector: CardDetector = Depends(get_card_detector),
+    card_filter: CardFilter = Depends(get_card_filter),
+    pipeline: RecognitionPipeline = Depends(get_recognition_pipeline),
+    degradation: Degradation = Depends(admit_request)
+):
+    try:
+        image = await preprocess_image(file, max_dim=settings.MULTI_CARD_MAX_IMAGE_DIM)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    profiling.annotate(degradation=degradation.label, card_filter=asdict(card_filter))
 
-    # Find best embedding match
-    best_emb_card, best_emb_score = card_matcher.get_best_embedding_match(image, cards)
+    def recognize_page():
+        # Detection and cropping are CPU-bound too, keep them off the event loop
+        with profiling.stage("detection"):
+            boxes, crops = zip(*detector.crop_cards(image))
+        return boxes, pipeline.recognize_batch(list(crops), degradation, card_filter)
 
-    # Select best overall match
-    result = card_matcher.select_best_match(
-        best_text_card, best_text_score,
-        best_emb_card, best_emb_score
-    )
+    try:
+        boxes, results = await run_in_threadpool(profiling.call, recognize_page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except EmptyCatalogueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-    return CardRecognitionResponse(
-        is_card=result.is_card,
-        confidence=result.confidence,
-        card={
-            "name": result.card.name if result.card else None,
-            "text_match_score": float(f"{result.text_score:.4f}"),
-            "embedding_match_score": float(f"{result.embedding_score:.4f}"),
-        }
-    )
+    cards = [
+        DetectedCard(
+            **CardRecognitionResponse.from_result(result).model_dump(),
+            bbox={"x": box.x, "y": box.y, "width": box.width, "height": box.height},
+        )
+        for box, result in zip(boxes, results)
+    ]
+    return MultiCardRecognitionResponse(count=len(cards), cards=cards)
@@ -1,15 +1,40 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+import base64
+import binascii
+import numpy as np
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
+from src.the_way_recognition.config import settings
+from src.the_way_recognition.core.index import CardFilter
+from src.the_way_recognition.core.matching import MatchResult
 
 class CardMatch(BaseModel):
     name: Optional[str] = None
     text_match_score: float = Field(..., ge=0.0, le=1.0)
     embedding_match_score: float = Field(..., ge=0.0, le=1.0)
+    hash_match_score: float = Field(0.0, ge=0.0, le=1.0)
 
 class CardRecognitionResponse(BaseModel):
     is_card: bool
     confidence: str = Field(..., pattern="^(high|medium|low|none)$")
     card: CardMatch
+    degradation: str = Field(
+        "none", pattern="^(none|reduced_resolution|embedding_only)$"
+    )
+
+    @classmethod
+    def from_result(cls, result: MatchResult) -> "CardRecognitionResponse":
+        return cls(
+            is_card=result.is_card,
+            confidence=result.confidence,
+            card={
+                "name": result.card.name if result.card else None,
+                "text_match_score": float(f"{result.text_score:.4f}"),
+                # Cosine similarity of unrelated vectors can be negative
+                "embedding_match_score": float(f"{max(result.embedding_score, 0.0):.4f}"),
+                "hash_match_score": float(f"{result.hash_score:.4f}"),
+            },
+            degradation=result.degradation.label,
+        )
 
     class Config:
         json_schema_extra = {
@@ -19,7 +44,102 @@ class CardRecognitionResponse(BaseModel):
                 "card": {
                     "name": "Example Card",
                     "text_match_score": 0.87,
-                    "embedding_match_score": 0.92
-                }
+                    "embedding_match_score": 0.92,
+                    "hash_match_score": 0.0
+                },
+                "degradation": "none"
+            }
+        }
+
+class FeatureRecognitionRequest(BaseModel):
+    model: Optional[str] = None
+    embedding: Optional[List[float]] = None
+    embedding_base64: Optional[str] = None
+    ocr_text: Optional[str] = None
+    edition: List[str] = []
+    rarity: List[str] = []
+    candidates: List[str] = []
+
+    @model_validator(mode="after")
+    def check_features(self) -> "FeatureRecognitionRequest":
+        if self.embedding is not None and self.embedding_base64 is not None:
+            raise ValueError("Send either embedding or embedding_base64, not both")
+        if self.ocr_text is None and not self.has_embedding:
+            raise ValueError("Either ocr_text or an embedding is required")
+        # Vectors from another CLIP model live in a different space
+        if self.has_embedding and self.model != settings.CLIP_MODEL:
+            raise ValueError(
+                f"Embedding model {self.model!r} does not match the service model "
+                f"{settings.CLIP_MODEL!r}"
+            )
+        if self.has_embedding:
+            vector = self.query_embedding()
+            if not np.all(np.isfinite(vector)) or not np.any(vector):
+                raise ValueError("Embedding must be finite and non-zero")
+        return self
+
+    @property
+    def has_embedding(self) -> bool:
+        return self.embedding is not None or self.embedding_base64 is not None
+
+    def query_embedding(self) -> Optional[np.ndarray]:
+        if self.embedding is not None:
+            return np.asarray(self.embedding, dtype=np.float32)
+        if self.embedding_base64 is None:
+            return None
+
+        # Compact form: little-endian float32 values, base64 encoded
+        try:
+            raw = base64.b64decode(self.embedding_base64, validate=True)
+        except binascii.Error:
+            raise ValueError("embedding_base64 is not valid base64")
+        if not raw or len(raw) % 4:
+            raise ValueError("embedding_base64 must hold float32 values")
+        return np.frombuffer(raw, dtype="<f4").astype(np.float32)
+
+    def card_filter(self) -> CardFilter:
+        return CardFilter(tuple(self.edition), tuple(self.rarity), tuple(self.candidates))
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "model": "ViT-B/32",
+                "embedding_base64": "<base64 of 512 little-endian float32 values>",
+                "ocr_text": "EXAMPLE CARD ...",
+                "edition": ["2"]
+            }
+        }
+
+class BoundingBox(BaseModel):
+    x: int = Field(..., ge=0)
+    y: int = Field(..., ge=0)
+    width: int = Field(..., gt=0)
+    height: int = Field(..., gt=0)
+
+class DetectedCard(CardRecognitionResponse):
+    bbox: BoundingBox
+
+class MultiCardRecognitionResponse(BaseModel):
+    count: int
+    cards: List[DetectedCard]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "count": 1,
+                "cards": [
+                    {
+                        "is_card": True,
+                        "confidence": "high",
+                        "card": {
+                            "name": "Example Card",
+                            "text_match_score": 0.87,
+                            "embedding_match_score": 0.92,
+                            "hash_match_score": 0.0
+                        },
+                        "degradation": "none",
+                        "bbox": {"x": 40, "y": 32, "width": 630, "height": 880}
+                    }
+                ]
             }
         }
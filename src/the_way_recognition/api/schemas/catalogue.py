@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+
+class CatalogueVersionResponse(BaseModel):
+    version: int
+    cards: int
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "version": 12,
+                "cards": 50
+            }
+        }
+
+class CatalogueUpdateResponse(BaseModel):
+    name: str
+    version: int
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "name": "Example Card",
+                "version": 13
+            }
+        }
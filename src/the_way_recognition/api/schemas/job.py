@@ -0,0 +1,29 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Optional
+
+class JobProgress(BaseModel):
+    pending: int = 0
+    running: int = 0
+    done: int = 0
+    failed: int = 0
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str = Field(..., pattern="^(pending|running|completed)$")
+    total: int
+    progress: JobProgress
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "job_id": "3f1c9a0e5b7d4e2a8c6b1d0f9e8a7b6c",
+                "status": "running",
+                "total": 1200,
+                "progress": {"pending": 940, "running": 8, "done": 250, "failed": 2},
+                "created_at": "2025-01-01T12:00:00Z",
+                "finished_at": None
+            }
+        }
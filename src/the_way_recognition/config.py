@@ -1,19 +1,37 @@
 from pydantic_settings import BaseSettings
 # import torch
 from functools import lru_cache
+from typing import Optional
 
 
 class Settings(BaseSettings):
     # Image processing
     MAX_IMAGE_DIM: int = 1000
+    MULTI_CARD_MAX_IMAGE_DIM: int = 3000
+
+    # Multi-card detection
+    DETECTION_DIM: int = 512
+    DETECTION_THRESHOLD: float = 40.0
+    DETECTION_LINE_FILL: float = 0.02
+    DETECTION_MIN_GAP: float = 0.01
+    DETECTION_MIN_AREA: float = 0.01
+    CARD_ASPECT_MIN: float = 0.55
+    CARD_ASPECT_MAX: float = 0.9
+    MAX_CARDS_PER_IMAGE: int = 20
 
     # Model settings
     DEVICE: str = "cpu"
     CLIP_MODEL: str = "ViT-B/32"
+    EMBEDDING_CONCURRENCY: int = 1
 
     # OCR settings
     TESSERACT_LANG: str = "slk"
     TESSERACT_CONFIG: str = "--psm 6"
+    OCR_WORKERS: int = 4
+    # Grayscale and adaptive thresholding before OCR
+    OCR_PREPROCESS: bool = False
+    OCR_TEXT_HEIGHT_RATIO: float = 0.016  # body text height relative to the long edge, sets the threshold window
+    OCR_THRESHOLD_OFFSET: int = 10
 
     # Confidence thresholds
     CONFIDENCE_HIGH: float = 0.75
@@ -25,8 +43,55 @@ class Settings(BaseSettings):
     EMBED_WEIGHT: float = 0.6
     CONSENSUS_BOOST: float = 0.15   
 
+    # Perceptual hash fast path (max Hamming distance out of 64 bits, 0 disables)
+    HASH_MATCH_MAX_DISTANCE: int = 6
+    # Bits the next closest other card must be further away for a hash hit
+    HASH_MATCH_MIN_MARGIN: int = 4
+
     # Database
     DATABASE_URL: str = "sqlite:///./cards.db"
+    DB_READ_POOL_SIZE: int = 5
+    DB_MMAP_SIZE: int = 256 * 1024 * 1024  # bytes of the database file mapped by readers
+    DB_CACHE_SIZE: int = 64 * 1024  # KiB of page cache per connection
+
+    # Catalogue, seconds between checks for a newer catalogue version (0 disables)
+    CATALOGUE_REFRESH_INTERVAL: float = 30.0
+    # Serve the catalogue from a prebuilt index artifact instead of the database
+    INDEX_ARTIFACT_PATH: Optional[str] = None
+    INDEX_ARTIFACT_VERIFY: bool = True
+    # Admin endpoints are disabled unless a token is set
+    ADMIN_TOKEN: Optional[str] = None
+
+    # Overload control, pressure is the larger of in-flight requests and the
+    # deepest stage queue relative to their limits
+    OVERLOAD_MAX_IN_FLIGHT: int = 32
+    OVERLOAD_MAX_STAGE_DEPTH: int = 24
+    OVERLOAD_REDUCED_RESOLUTION_AT: float = 0.5
+    OVERLOAD_EMBEDDING_ONLY_AT: float = 0.75
+    OVERLOAD_REJECT_AT: float = 1.0
+    OVERLOAD_OCR_IMAGE_DIM: int = 600
+    OVERLOAD_RETRY_AFTER: int = 5
+
+    # Bulk recognition jobs
+    JOBS_DATABASE_URL: str = "sqlite:///./jobs.db"
+    JOBS_DIR: str = "./jobs"
+    JOB_WORKERS: int = 1
+    JOB_WORKER_NICE: int = 10
+    JOB_WORKER_THREADS: int = 1
+    JOB_BATCH_SIZE: int = 8
+    JOB_POLL_INTERVAL: float = 1.0
+    # Seconds a claimed item stays with its worker without a heartbeat
+    JOB_LEASE_SECONDS: float = 60.0
+    JOB_MAX_ITEMS: int = 10000
+
+    # Profiling (opt-in): stage timings in a Server-Timing header, CPU profiles
+    # of sampled or header-triggered requests, capture of slow requests
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_HEADER: str = "X-Profile"
+    SLOW_REQUEST_THRESHOLD: float = 0.0  # seconds, 0 disables capture
+    CAPTURE_DIR: str = "./captures"
+    CAPTURE_MAX_REQUESTS: int = 100
 
     # API
     API_V1_PREFIX: str = "/api/v1"
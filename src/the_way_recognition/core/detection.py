@@ -0,0 +1,136 @@
+from dataclasses import dataclass
+from typing import List, Tuple
+import numpy as np
+from PIL import Image
+from src.the_way_recognition.config import settings
+from src.the_way_recognition.utils.image import limit_size
+
+
+@dataclass
+class BoundingBox:
+    x: int
+    y: int
+    width: int
+    height: int
+
+    def as_crop_box(self) -> Tuple[int, int, int, int]:
+        return self.x, self.y, self.x + self.width, self.y + self.height
+
+
+class CardDetector:
+    """
+    Finds card-shaped regions in a photo of several cards (playmat, binder page).
+
+    The image is split into a foreground mask against the border colour and then
+    cut recursively along empty rows and columns (XY-cut), which matches the
+    grid-like layouts cards are usually photographed in.
+    """
+
+    def detect(self, image: Image.Image) -> List[BoundingBox]:
+        scale = min(1.0, settings.DETECTION_DIM / max(image.size))
+        small = image.convert("L")
+        if scale < 1.0:
+            small = small.resize(
+                (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                Image.BILINEAR,
+            )
+
+        mask = self._foreground_mask(np.asarray(small, dtype=np.float32))
+        min_gap = max(2, round(min(mask.shape) * settings.DETECTION_MIN_GAP))
+        regions = self._xy_cut(mask, 0, 0, min_gap)
+
+        min_area = settings.DETECTION_MIN_AREA * mask.size
+        boxes = []
+        for top, left, bottom, right in regions:
+            height, width = bottom - top, right - left
+            if height * width < min_area:
+                continue
+            aspect = min(height, width) / max(height, width)
+            if not settings.CARD_ASPECT_MIN <= aspect <= settings.CARD_ASPECT_MAX:
+                continue
+            boxes.append(self._to_image_box(top, left, bottom, right, scale, image.size))
+
+        # Reading order: rows top to bottom, each left to right. Edges of cards
+        # in one row differ by a few pixels, so a box joins the current row
+        # when its centre lies within the row's first box
+        rows: List[List[BoundingBox]] = []
+        for box in sorted(boxes, key=lambda box: box.y + box.height / 2):
+            if rows and box.y + box.height / 2 < rows[-1][0].y + rows[-1][0].height:
+                rows[-1].append(box)
+            else:
+                rows.append([box])
+        boxes = [box for row in rows for box in sorted(row, key=lambda box: box.x)]
+        return boxes[:settings.MAX_CARDS_PER_IMAGE]
+
+    def crop_cards(self, image: Image.Image) -> List[Tuple[BoundingBox, Image.Image]]:
+        """Detected cards with their crops, the whole image if no card is found."""
+        # Fall back to the whole image so single-card photos work here too
+        boxes = self.detect(image) or [BoundingBox(0, 0, image.width, image.height)]
+        return [
+            (box, limit_size(image.crop(box.as_crop_box()), settings.MAX_IMAGE_DIM))
+            for box in boxes
+        ]
+
+    @staticmethod
+    def _foreground_mask(gray: np.ndarray) -> np.ndarray:
+        border = np.concatenate([gray[0], gray[-1], gray[:, 0], gray[:, -1]])
+        return np.abs(gray - np.median(border)) > settings.DETECTION_THRESHOLD
+
+    @staticmethod
+    def _segments(occupied: np.ndarray, min_gap: int) -> List[Tuple[int, int]]:
+        # Runs of occupied lines, merging runs separated by gaps shorter than min_gap
+        padded = np.concatenate([[False], occupied, [False]])
+        edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+        runs = edges.reshape(-1, 2)
+
+        segments = []
+        for start, end in runs:
+            if segments and start - segments[-1][1] < min_gap:
+                segments[-1] = (segments[-1][0], end)
+            else:
+                segments.append((start, end))
+        return segments
+
+    def _xy_cut(
+        self, mask: np.ndarray, top: int, left: int, min_gap: int
+    ) -> List[Tuple[int, int, int, int]]:
+        rows = mask.mean(axis=1) > settings.DETECTION_LINE_FILL
+        row_segments = self._segments(rows, min_gap)
+        if not row_segments:
+            return []
+
+        if len(row_segments) > 1:
+            regions = []
+            for start, end in row_segments:
+                regions.extend(self._xy_cut(mask[start:end], top + start, left, min_gap))
+            return regions
+
+        row_start, row_end = row_segments[0]
+        band = mask[row_start:row_end]
+        cols = band.mean(axis=0) > settings.DETECTION_LINE_FILL
+        col_segments = self._segments(cols, min_gap)
+        if not col_segments:
+            return []
+
+        if len(col_segments) > 1:
+            regions = []
+            for start, end in col_segments:
+                regions.extend(
+                    self._xy_cut(band[:, start:end], top + row_start, left + start, min_gap)
+                )
+            return regions
+
+        col_start, col_end = col_segments[0]
+        return [(top + row_start, left + col_start, top + row_end, left + col_end)]
+
+    @staticmethod
+    def _to_image_box(
+        top: int, left: int, bottom: int, right: int,
+        scale: float, size: Tuple[int, int]
+    ) -> BoundingBox:
+        width, height = size
+        x0 = max(0, int(left / scale))
+        y0 = max(0, int(top / scale))
+        x1 = min(width, int(np.ceil(right / scale)))
+        y1 = min(height, int(np.ceil(bottom / scale)))
+        return BoundingBox(x0, y0, x1 - x0, y1 - y0)
@@ -1,4 +1,6 @@
+import threading
 from functools import lru_cache
+from typing import List
 import clip
 import torch
 import numpy as np
@@ -8,6 +10,8 @@ from src.the_way_recognition.config import settings
 class EmbeddingService:
     def __init__(self):
         self.model, self.preprocess = self._load_model()
+        # Concurrent forward passes only fight over the same CPU cores
+        self._slots = threading.BoundedSemaphore(settings.EMBEDDING_CONCURRENCY)
 
     @staticmethod
     @lru_cache(maxsize=1)
@@ -16,6 +20,13 @@ class EmbeddingService:
 
     def encode_image(self, image: Image.Image) -> np.ndarray:
         img_tensor = self.preprocess(image).unsqueeze(0).to(settings.DEVICE)
-        with torch.no_grad():
+        with self._slots, torch.no_grad():
             embedding = self.model.encode_image(img_tensor).cpu().numpy().flatten()
         return embedding
+
+    def encode_images(self, images: List[Image.Image]) -> np.ndarray:
+        # One forward pass for the whole batch, one row per image
+        batch = torch.stack([self.preprocess(image) for image in images]).to(settings.DEVICE)
+        with self._slots, torch.no_grad():
+            embeddings = self.model.encode_image(batch).cpu().numpy()
+        return embeddings.reshape(len(images), -1)
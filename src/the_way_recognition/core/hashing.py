@@ -0,0 +1,141 @@
+from typing import Callable, Generic, Iterable, List, Optional, Tuple, TypeVar
+import numpy as np
+from PIL import Image
+
+HASH_BITS = 64
+_HASH_SIZE = 8
+_DCT_SIZE = 32
+
+T = TypeVar("T")
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix.astype(np.float32)
+
+
+_DCT = _dct_matrix(_DCT_SIZE)
+
+
+def compute_phash(image: Image.Image) -> int:
+    """64-bit DCT perceptual hash of an image."""
+    gray = image.convert("L").resize((_DCT_SIZE, _DCT_SIZE), Image.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.float32)
+    dct = _DCT @ pixels @ _DCT.T
+    low = dct[:_HASH_SIZE, :_HASH_SIZE].flatten()
+
+    # The DC term only carries the mean brightness, keep it out of the median
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hash_to_hex(value: int) -> str:
+    return f"{value:016x}"
+
+
+def hash_from_hex(value: str) -> int:
+    return int(value, 16)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class _Node(Generic[T]):
+    __slots__ = ("value", "items", "children")
+
+    def __init__(self, value: int, item: T):
+        self.value = value
+        self.items = [item]
+        self.children = {}
+
+
+class BKTree(Generic[T]):
+    """Burkhard-Keller tree over 64-bit hashes using Hamming distance."""
+
+    def __init__(self):
+        self._root: Optional[_Node[T]] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int, item: T) -> None:
+        self._size += 1
+        if self._root is None:
+            self._root = _Node(value, item)
+            return
+
+        node = self._root
+        while True:
+            distance = hamming_distance(value, node.value)
+            if distance == 0:
+                node.items.append(item)
+                return
+            child = node.children.get(distance)
+            if child is None:
+                node.children[distance] = _Node(value, item)
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, T]]:
+        results = []
+        stack = [self._root] if self._root else []
+
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node.value)
+            if distance <= max_distance:
+                results.extend((distance, item) for item in node.items)
+
+            # Triangle inequality: only subtrees in this band can be close enough
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(
+                child for d, child in node.children.items() if low <= d <= high
+            )
+
+        results.sort(key=lambda result: result[0])
+        return results
+
+
+class HashIndex(Generic[T]):
+    def __init__(self, entries: Iterable[Tuple[int, T]], key=lambda item: item):
+        self._tree: BKTree[T] = BKTree()
+        self._key = key
+        for value, item in entries:
+            self._tree.add(value, item)
+
+    def __len__(self) -> int:
+        return len(self._tree)
+
+    def lookup(
+        self,
+        value: int,
+        max_distance: int,
+        accept: Optional[Callable[[T], bool]] = None,
+        min_margin: int = 1,
+    ) -> Optional[Tuple[T, int]]:
+        """
+        Closest item within max_distance, or None if there is no unambiguous hit:
+        any other item must be at least min_margin bits further away.
+        """
+        # Search past max_distance, a rival just outside it still makes the hit ambiguous
+        hits = self._tree.search(value, max_distance + max(min_margin, 1) - 1)
+        if accept is not None:
+            hits = [(distance, item) for distance, item in hits if accept(item)]
+        if not hits or hits[0][0] > max_distance:
+            return None
+
+        best_distance, best_item = hits[0]
+        for distance, item in hits[1:]:
+            if distance - best_distance >= min_margin:
+                break
+            # Another card almost as close - cards share frame layouts, so
+            # let the full pipeline decide
+            if self._key(item) != self._key(best_item):
+                return None
+
+        return best_item, best_distance
@@ -0,0 +1,175 @@
+import threading
+import unicodedata
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from src.the_way_recognition.core.hashing import HashIndex, hash_from_hex
+from src.the_way_recognition.db.models import Card
+
+PARTITION_FIELDS = ("edition", "rarity")
+
+
+def normalize_key(value) -> str:
+    text = unicodedata.normalize("NFD", str(value))
+    return "".join(c for c in text if unicodedata.category(c) != "Mn").strip().casefold()
+
+
+@dataclass(frozen=True, slots=True)
+class CardRecord:
+    """Card metadata kept in the index, detached from the database session."""
+    name: str
+    edition: Optional[str] = None
+    rarity: Optional[str] = None
+    gt_text: Optional[str] = None
+    gt_hash: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class CardFilter:
+    editions: Tuple[str, ...] = ()
+    rarities: Tuple[str, ...] = ()
+    names: Tuple[str, ...] = ()
+
+    def __bool__(self) -> bool:
+        return bool(self.editions or self.rarities or self.names)
+
+
+class CardIndex:
+    """
+    Read-only in-memory view of the catalogue: card texts, a normalized
+    embedding matrix, the perceptual hash index and per-field partitions
+    used to restrict a search to a subset of rows.
+    """
+
+    def __init__(
+        self,
+        cards: List[CardRecord],
+        embeddings: Tuple[np.ndarray, np.ndarray],
+        version: int = 0,
+    ):
+        # embeddings is the (normalized matrix, has_embedding) pair, one row per card
+        self.version = version
+        self.cards = list(cards)
+        self.texts = [card.gt_text or "" for card in self.cards]
+        self.embeddings, self.has_embedding = embeddings
+        self.hash_index: HashIndex[int] = HashIndex(
+            (
+                (hash_from_hex(card.gt_hash), row)
+                for row, card in enumerate(self.cards)
+                if card.gt_hash
+            ),
+            key=lambda row: self.cards[row].name,
+        )
+
+        self._rows_by_name: Dict[str, int] = {
+            normalize_key(card.name): row for row, card in enumerate(self.cards)
+        }
+        self.partitions: Dict[str, Dict[str, np.ndarray]] = {
+            field: self._partition(field) for field in PARTITION_FIELDS
+        }
+        self.all_rows = np.arange(len(self.cards))
+
+        for array in (self.embeddings, self.has_embedding, self.all_rows):
+            array.flags.writeable = False
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    @classmethod
+    def from_cards(cls, cards: Sequence[Card], version: int = 0) -> "CardIndex":
+        # Card objects or rows with the same column names
+        records = [
+            CardRecord(card.name, card.edition, card.rarity, card.gt_text, card.gt_hash)
+            for card in cards
+        ]
+        return cls(records, cls._embedding_matrix(cards), version)
+
+    @staticmethod
+    def _embedding_matrix(cards: Sequence[Card]) -> Tuple[np.ndarray, np.ndarray]:
+        vectors = [
+            np.frombuffer(card.gt_embedding, dtype=np.float32) if card.gt_embedding else None
+            for card in cards
+        ]
+        dim = next((len(vector) for vector in vectors if vector is not None), 0)
+        matrix = np.zeros((len(cards), dim), dtype=np.float32)
+        for row, vector in enumerate(vectors):
+            if vector is not None:
+                matrix[row] = vector
+
+        # Normalized once here so a search is a single matrix-vector product
+        norms = np.linalg.norm(matrix, axis=1)
+        has_embedding = norms > 0
+        matrix[has_embedding] /= norms[has_embedding, None]
+        return matrix, has_embedding
+
+    def _partition(self, field: str) -> Dict[str, np.ndarray]:
+        rows: Dict[str, List[int]] = {}
+        for row, card in enumerate(self.cards):
+            value = getattr(card, field)
+            if value is not None:
+                rows.setdefault(normalize_key(value), []).append(row)
+        return {value: np.array(indices) for value, indices in rows.items()}
+
+    def _rows_for(self, field: str, values: Tuple[str, ...]) -> np.ndarray:
+        partition = self.partitions[field]
+        parts = [partition.get(normalize_key(value)) for value in values]
+        parts = [part for part in parts if part is not None]
+        return np.unique(np.concatenate(parts)) if parts else np.array([], dtype=int)
+
+    def select(self, card_filter: Optional[CardFilter] = None) -> np.ndarray:
+        """Row indices matching all given filters, every row without a filter."""
+        if not card_filter:
+            return self.all_rows
+
+        rows = self.all_rows
+        if card_filter.editions:
+            rows = np.intersect1d(rows, self._rows_for("edition", card_filter.editions))
+        if card_filter.rarities:
+            rows = np.intersect1d(rows, self._rows_for("rarity", card_filter.rarities))
+        if card_filter.names:
+            named = [self._rows_by_name.get(normalize_key(name)) for name in card_filter.names]
+            rows = np.intersect1d(rows, [row for row in named if row is not None])
+        return rows
+
+
+class IndexHolder:
+    """
+    Holds the current CardIndex snapshot. Snapshots are never modified, a
+    refresh builds a new one and swaps the reference, so readers need no lock
+    and in-flight requests keep the snapshot they started with.
+    """
+
+    def __init__(
+        self,
+        load_version: Callable[[], int],
+        load_index: Callable[[], CardIndex],
+    ):
+        self._load_version = load_version
+        self._load_index = load_index
+        self._refresh_lock = threading.Lock()
+        self._current: Optional[CardIndex] = None
+
+    @property
+    def current(self) -> CardIndex:
+        if self._current is None:
+            self.refresh()
+        return self._current
+
+    @property
+    def version(self) -> int:
+        return self.current.version
+
+    def is_current(self, version: int) -> bool:
+        """Whether the loaded snapshot has this version, without loading one."""
+        current = self._current
+        return current is not None and current.version == version
+
+    def refresh(self, force: bool = False) -> CardIndex:
+        # Only rebuilds are serialized, readers keep using the old snapshot
+        with self._refresh_lock:
+            current = self._current
+            if current is not None and not force and self._load_version() == current.version:
+                return current
+
+            self._current = self._load_index()
+            return self._current
@@ -1,62 +1,82 @@
 from dataclasses import dataclass
-from typing import Optional, Tuple, List
+from typing import Optional, Tuple
 import Levenshtein
 import numpy as np
 from src.the_way_recognition.config import settings
-from src.the_way_recognition.db.models import Card
 from src.the_way_recognition.core.embeddings import EmbeddingService
+from src.the_way_recognition.core.hashing import HASH_BITS, compute_phash
+from src.the_way_recognition.core.index import CardIndex, CardRecord
+from src.the_way_recognition.core.overload import Degradation
 
 
 @dataclass
 class MatchResult:
-    card: Optional[Card]
+    card: Optional[CardRecord]
     text_score: float
     embedding_score: float
     is_card: bool
     confidence: str
+    hash_score: float = 0.0
+    degradation: Degradation = Degradation.NONE
 
 
 class CardMatcher:
     def __init__(self, embedding_service: EmbeddingService):
         self.embedding_service = embedding_service
 
+    def get_hash_match(
+        self, image, index: CardIndex, rows: Optional[np.ndarray] = None
+    ) -> Optional[MatchResult]:
+        if settings.HASH_MATCH_MAX_DISTANCE <= 0 or not len(index.hash_index):
+            return None
+
+        allowed = None if rows is None or len(rows) == len(index) else set(rows.tolist())
+        hit = index.hash_index.lookup(
+            compute_phash(image),
+            settings.HASH_MATCH_MAX_DISTANCE,
+            accept=None if allowed is None else allowed.__contains__,
+            min_margin=settings.HASH_MATCH_MIN_MARGIN,
+        )
+        if hit is None:
+            return None
+
+        row, distance = hit
+        hash_score = 1.0 - distance / HASH_BITS
+        return MatchResult(index.cards[row], 0.0, 0.0, True, "high", hash_score)
+
     def get_best_text_match(
-        self, ocr_text: str, cards: List[Card]
-    ) -> Tuple[Optional[Card], float]:
+        self, ocr_text: str, index: CardIndex, rows: Optional[np.ndarray] = None
+    ) -> Tuple[Optional[CardRecord], float]:
         best_card = None
         best_score = 0.0
 
-        for card in cards:
-            similarity = Levenshtein.ratio(ocr_text, card.gt_text)
+        for row in index.all_rows if rows is None else rows:
+            similarity = Levenshtein.ratio(ocr_text, index.texts[row])
 
             if similarity > best_score:
                 best_score = similarity
-                best_card = card
+                best_card = index.cards[row]
 
         return best_card, best_score
 
     def get_best_embedding_match(
-        self, image, cards: List[Card]
-    ) -> Tuple[Optional[Card], float]:
+        self, image, index: CardIndex, rows: Optional[np.ndarray] = None
+    ) -> Tuple[Optional[CardRecord], float]:
         query_embedding = self.embedding_service.encode_image(image)
+        return self.match_embedding(query_embedding, index, rows)
 
-        best_card = None
-        best_score = -1
-
-        for card in cards:
-            if card.gt_embedding:
-                db_emb = np.frombuffer(card.gt_embedding, dtype=np.float32)
-                score = self._cosine_similarity(query_embedding, db_emb)
-
-                if score > best_score:
-                    best_score = score
-                    best_card = card
-
-        return best_card, best_score
+    def match_embedding(
+        self, query_embedding: np.ndarray, index: CardIndex, rows: Optional[np.ndarray] = None
+    ) -> Tuple[Optional[CardRecord], float]:
+        rows = index.all_rows if rows is None else rows
+        rows = rows[index.has_embedding[rows]]
+        if not len(rows):
+            return None, -1
 
-    @staticmethod
-    def _cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
-        return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+        # Reference rows are unit length, so this is the cosine similarity
+        scores = index.embeddings[rows] @ query_embedding / np.linalg.norm(query_embedding)
+        best = int(np.argmax(scores))
+        return index.cards[rows[best]], float(scores[best])
 
     def calculate_combined_score(
         self, text_score: float, emb_score: float, same_card: bool = False
@@ -71,9 +91,9 @@ class CardMatcher:
 
     def select_best_match(
         self,
-        text_card: Optional[Card],
+        text_card: Optional[CardRecord],
         text_score: float,
-        emb_card: Optional[Card],
+        emb_card: Optional[CardRecord],
         emb_score: float,
     ) -> MatchResult:
 
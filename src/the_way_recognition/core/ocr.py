@@ -1,12 +1,50 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+import numpy as np
 import pytesseract
-from PIL import Image
+from PIL import Image, ImageFilter
 from src.the_way_recognition.config import settings
+from src.the_way_recognition.core import profiling
+
+def prepare_for_ocr(image: Image.Image) -> Image.Image:
+    """
+    Grayscale image binarized against the local mean so uneven lighting and
+    foil don't leak into the text.
+    """
+    gray = image.convert("L")
+
+    # Body text is a roughly fixed fraction of the card, so the card size
+    # gives the text height without having to find the text first
+    text_height = max(1, round(settings.OCR_TEXT_HEIGHT_RATIO * max(gray.size)))
+
+    # Local mean over a window about twice the text height
+    mean = gray.filter(ImageFilter.BoxBlur(text_height))
+    pixels = np.asarray(gray, dtype=np.int16)
+    binary = pixels > np.asarray(mean, dtype=np.int16) - settings.OCR_THRESHOLD_OFFSET
+    return Image.fromarray(binary)
+
 
 class OCRService:
+    def __init__(self):
+        # Tesseract runs as a subprocess, so threads give real parallelism
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.OCR_WORKERS, thread_name_prefix="ocr"
+        )
+
     @staticmethod
-    def extract_text(image: Image.Image) -> str:
+    def extract_text(image: Image.Image, preprocess: Optional[bool] = None) -> str:
+        if settings.OCR_PREPROCESS if preprocess is None else preprocess:
+            image = prepare_for_ocr(image)
         return pytesseract.image_to_string(
             image,
             config=settings.TESSERACT_CONFIG,
             lang=settings.TESSERACT_LANG
         )
+
+    def _timed_extract_text(self, image: Image.Image) -> str:
+        with profiling.stage("ocr"):
+            return self.extract_text(image)
+
+    def submit(self, image: Image.Image) -> Future:
+        # Bound to the request context so the OCR time lands in its profile
+        return self._executor.submit(profiling.bind(self._timed_extract_text), image)
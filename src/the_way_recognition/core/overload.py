@@ -0,0 +1,83 @@
+import threading
+from collections import defaultdict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from enum import IntEnum
+from src.the_way_recognition.config import settings
+
+
+class Degradation(IntEnum):
+    NONE = 0
+    REDUCED_RESOLUTION = 1
+    EMBEDDING_ONLY = 2
+    REJECTED = 3
+
+    @property
+    def label(self) -> str:
+        return self.name.lower()
+
+
+class OverloadError(RuntimeError):
+    def __init__(self, retry_after: int):
+        super().__init__("Service overloaded, retry later")
+        self.retry_after = retry_after
+
+
+class OverloadController:
+    """
+    Tracks in-flight requests and per-stage queue depth and maps the current
+    pressure to a degradation level for newly admitted requests.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._depth = defaultdict(int)
+
+    def _pressure(self) -> float:
+        deepest = max(self._depth.values(), default=0)
+        return max(
+            self._in_flight / settings.OVERLOAD_MAX_IN_FLIGHT,
+            deepest / settings.OVERLOAD_MAX_STAGE_DEPTH,
+        )
+
+    @staticmethod
+    def _level(pressure: float) -> Degradation:
+        if pressure >= settings.OVERLOAD_REJECT_AT:
+            return Degradation.REJECTED
+        if pressure >= settings.OVERLOAD_EMBEDDING_ONLY_AT:
+            return Degradation.EMBEDDING_ONLY
+        if pressure >= settings.OVERLOAD_REDUCED_RESOLUTION_AT:
+            return Degradation.REDUCED_RESOLUTION
+        return Degradation.NONE
+
+    def acquire(self) -> Degradation:
+        """Admit a request, raises OverloadError when it has to be shed."""
+        with self._lock:
+            level = self._level(self._pressure())
+            if level == Degradation.REJECTED:
+                raise OverloadError(settings.OVERLOAD_RETRY_AFTER)
+            self._in_flight += 1
+            return level
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _add(self, stage: str, count: int) -> None:
+        with self._lock:
+            self._depth[stage] += count
+
+    @contextmanager
+    def stage(self, name: str, count: int = 1):
+        self._add(name, count)
+        try:
+            yield
+        finally:
+            self._add(name, -count)
+
+    def track(self, name: str, future: Future) -> Future:
+        """Count work queued on an executor until it finishes."""
+        self._add(name, 1)
+        future.add_done_callback(lambda _: self._add(name, -1))
+        return future
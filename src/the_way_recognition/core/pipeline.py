@@ -0,0 +1,147 @@
+from contextlib import nullcontext
+from typing import List, Optional
+import numpy as np
+from PIL import Image
+from src.the_way_recognition.config import settings
+from src.the_way_recognition.core import profiling
+from src.the_way_recognition.core.index import CardFilter, CardIndex
+from src.the_way_recognition.core.matching import CardMatcher, MatchResult
+from src.the_way_recognition.core.ocr import OCRService
+from src.the_way_recognition.core.overload import Degradation, OverloadController
+from src.the_way_recognition.utils.image import limit_size
+
+
+class EmptyCatalogueError(RuntimeError):
+    pass
+
+
+class RecognitionPipeline:
+    def __init__(
+        self,
+        ocr_service: OCRService,
+        card_matcher: CardMatcher,
+        index: CardIndex,
+        controller: Optional[OverloadController] = None,
+    ):
+        self.ocr_service = ocr_service
+        self.card_matcher = card_matcher
+        self.index = index
+        self.controller = controller
+
+    def _select(self, card_filter: Optional[CardFilter]) -> np.ndarray:
+        if not len(self.index):
+            raise EmptyCatalogueError("No cards found in database")
+
+        rows = self.index.select(card_filter)
+        if not len(rows):
+            raise ValueError("No cards match the given filters")
+        return rows
+
+    def _stage(self, name: str, count: int = 1):
+        return self.controller.stage(name, count) if self.controller else nullcontext()
+
+    def _submit_ocr(self, image: Image.Image, degradation: Degradation):
+        if degradation >= Degradation.EMBEDDING_ONLY:
+            return None
+        if degradation >= Degradation.REDUCED_RESOLUTION:
+            image = limit_size(image.copy(), settings.OVERLOAD_OCR_IMAGE_DIM)
+
+        future = self.ocr_service.submit(image)
+        if self.controller:
+            self.controller.track("ocr", future)
+        return future
+
+    def _match(
+        self, ocr_text: Optional[str], query_embedding: Optional[np.ndarray], rows: np.ndarray
+    ) -> MatchResult:
+        if ocr_text is None:
+            best_text_card, best_text_score = None, 0.0
+        else:
+            best_text_card, best_text_score = self.card_matcher.get_best_text_match(
+                ocr_text, self.index, rows
+            )
+        if query_embedding is None:
+            best_emb_card, best_emb_score = None, 0.0
+        else:
+            best_emb_card, best_emb_score = self.card_matcher.match_embedding(
+                query_embedding, self.index, rows
+            )
+
+        result = self.card_matcher.select_best_match(
+            best_text_card, best_text_score,
+            best_emb_card, best_emb_score
+        )
+        # select_best_match reports a single confident score for both signals,
+        # one that never ran must not look like a match
+        if ocr_text is None:
+            result.text_score = 0.0
+        if query_embedding is None:
+            result.embedding_score = 0.0
+        return result
+
+    def recognize_features(
+        self,
+        ocr_text: Optional[str] = None,
+        embedding: Optional[np.ndarray] = None,
+        degradation: Degradation = Degradation.NONE,
+        card_filter: Optional[CardFilter] = None,
+    ) -> MatchResult:
+        """Match features computed by the client, no image decoding or inference."""
+        if ocr_text is None and embedding is None:
+            raise ValueError("Either ocr_text or an embedding is required")
+
+        rows = self._select(card_filter)
+        if embedding is not None and embedding.shape != self.index.embeddings.shape[1:]:
+            raise ValueError(
+                f"Embedding has {embedding.size} dimensions, "
+                f"the catalogue uses {self.index.embeddings.shape[1]}"
+            )
+        with profiling.stage("match"):
+            result = self._match(ocr_text, embedding, rows)
+        # Nothing to degrade here, the admission level is reported as is
+        result.degradation = degradation
+        return result
+
+    def recognize(
+        self,
+        image: Image.Image,
+        degradation: Degradation = Degradation.NONE,
+        card_filter: Optional[CardFilter] = None,
+    ) -> MatchResult:
+        return self.recognize_batch([image], degradation, card_filter)[0]
+
+    def recognize_batch(
+        self,
+        images: List[Image.Image],
+        degradation: Degradation = Degradation.NONE,
+        card_filter: Optional[CardFilter] = None,
+    ) -> List[MatchResult]:
+        rows = self._select(card_filter)
+
+        # Near-identical copies of a reference image skip OCR and CLIP
+        with profiling.stage("hash"):
+            results: List[Optional[MatchResult]] = [
+                self.card_matcher.get_hash_match(image, self.index, rows) for image in images
+            ]
+        pending = [i for i, result in enumerate(results) if result is None]
+        for result in results:
+            if result is not None:
+                result.degradation = degradation
+        if not pending:
+            return results
+
+        pending_images = [images[i] for i in pending]
+
+        # OCR runs in the background while CLIP encodes the whole batch at once
+        ocr_futures = [self._submit_ocr(image, degradation) for image in pending_images]
+        with self._stage("embedding", len(pending_images)), profiling.stage("embedding"):
+            embeddings = self.card_matcher.embedding_service.encode_images(pending_images)
+
+        for i, future, embedding in zip(pending, ocr_futures, embeddings):
+            with profiling.stage("ocr_wait"):
+                ocr_text = future.result() if future else None
+            with profiling.stage("match"):
+                results[i] = self._match(ocr_text, embedding, rows)
+            results[i].degradation = degradation
+
+        return results
@@ -0,0 +1,142 @@
+"""
+Opt-in per-request profiling.
+
+A RequestProfile is bound to the current request through a context variable,
+so code deep in the pipeline can time its stages without passing it around.
+Without an active profile every helper here is a no-op.
+"""
+import cProfile
+import contextvars
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_current: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "request_profile", default=None
+)
+
+# cProfile hooks into the interpreter globally, only one can run at a time
+_cpu_profile_slot = threading.Lock()
+
+
+class RequestProfile:
+    def __init__(self, cpu: bool = False):
+        self.id = uuid.uuid4().hex[:12]
+        self.started_at = datetime.now(timezone.utc)
+        self.stages: Dict[str, float] = {}
+        self.params: Dict[str, Any] = {}
+        self.inputs: List[Tuple[str, bytes]] = []
+        self.cpu_profile = cProfile.Profile() if cpu else None
+        self.cpu_profiled = False
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        # Stages of a batch run in parallel threads, their times add up
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def server_timing(self, total: float) -> str:
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+    def save(self, directory: Path, record: Dict[str, Any]) -> Path:
+        """Write input files, timings and the CPU profile to a capture directory."""
+        # Microseconds keep captures of the same second in order by name
+        stamp = self.started_at.strftime("%Y%m%d-%H%M%S-%f")
+        path = Path(directory) / f"{stamp}-{self.id}"
+        path.mkdir(parents=True, exist_ok=True)
+
+        inputs = []
+        for i, (filename, data) in enumerate(self.inputs):
+            name = f"input-{i}{Path(filename or '').suffix}"
+            (path / name).write_bytes(data)
+            inputs.append({"file": name, "filename": filename})
+
+        if self.cpu_profiled:
+            self.cpu_profile.dump_stats(path / "profile.prof")
+
+        record = {
+            "id": self.id,
+            "started_at": self.started_at.isoformat(),
+            **record,
+            "stages": {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            "params": self.params,
+            "inputs": inputs,
+            "cpu_profile": "profile.prof" if self.cpu_profiled else None,
+        }
+        (path / "request.json").write_text(json.dumps(record, indent=2, default=str))
+        return path
+
+
+def current() -> Optional[RequestProfile]:
+    return _current.get()
+
+
+def activate(profile: Optional[RequestProfile]) -> contextvars.Token:
+    return _current.set(profile)
+
+
+def deactivate(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - start)
+
+
+def record_input(filename: Optional[str], data: bytes) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.inputs.append((filename or "", data))
+
+
+def annotate(**params) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.params.update(params)
+
+
+def call(func: Callable[..., T], *args) -> T:
+    """Run func under the request's CPU profiler, if one was requested."""
+    profile = _current.get()
+    if profile is None or profile.cpu_profile is None:
+        return func(*args)
+    if not _cpu_profile_slot.acquire(blocking=False):
+        # Another request is being profiled, this one only gets stage timings
+        return func(*args)
+
+    try:
+        profile.cpu_profile.enable()
+        try:
+            return func(*args)
+        finally:
+            profile.cpu_profile.disable()
+            profile.cpu_profiled = True
+    finally:
+        _cpu_profile_slot.release()
+
+
+def bind(func: Callable[..., T]) -> Callable[..., T]:
+    """Bind func to the current context, for work handed to other threads."""
+    if _current.get() is None:
+        return func
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
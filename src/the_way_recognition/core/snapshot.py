@@ -0,0 +1,149 @@
+"""
+Portable index artifact.
+
+A single file holding everything a service node needs to build a CardIndex
+without touching the database:
+
+    8 bytes   magic b"TWINDEX1"
+    8 bytes   header length, little-endian uint64
+    n bytes   JSON header (format, catalogue version, model, card metadata,
+              array layout, SHA-256 checksum)
+    padding   to a 64-byte boundary
+    data      arrays at the offsets given in the header
+
+The arrays are raw C-ordered buffers so they can be memory-mapped. The file
+content only depends on the catalogue, so the same catalogue always produces
+the same artifact.
+"""
+import hashlib
+import json
+import os
+import struct
+from pathlib import Path
+from typing import Tuple, Union
+import numpy as np
+from src.the_way_recognition.config import settings
+from src.the_way_recognition.core.index import CardIndex, CardRecord
+
+MAGIC = b"TWINDEX1"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_PREFIX = struct.Struct("<8sQ")
+
+PathLike = Union[str, Path]
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _checksum(header: dict, data: memoryview) -> str:
+    digest = hashlib.sha256(json.dumps(header, sort_keys=True).encode("utf-8"))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def save_index(index: CardIndex, path: PathLike) -> dict:
+    """Write the index to path atomically, returns the header."""
+    order = sorted(range(len(index)), key=lambda row: index.cards[row].name)
+    arrays = {
+        "embeddings": np.ascontiguousarray(index.embeddings[order], dtype=np.float32),
+        "has_embedding": np.ascontiguousarray(index.has_embedding[order], dtype=np.bool_),
+    }
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        layout[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset += array.nbytes
+
+    data = bytearray(offset)
+    for name, array in arrays.items():
+        start = layout[name]["offset"]
+        data[start:start + array.nbytes] = array.tobytes()
+
+    header = {
+        "format": FORMAT_VERSION,
+        "version": index.version,
+        "model": settings.CLIP_MODEL,
+        "cards": [
+            {
+                "name": index.cards[row].name,
+                "edition": index.cards[row].edition,
+                "rarity": index.cards[row].rarity,
+                "gt_text": index.cards[row].gt_text,
+                "gt_hash": index.cards[row].gt_hash,
+            }
+            for row in order
+        ],
+        "arrays": layout,
+    }
+    header["checksum"] = _checksum(header, memoryview(data))
+    header_bytes = json.dumps(header, sort_keys=True).encode("utf-8")
+    data_start = _align(_PREFIX.size + len(header_bytes))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (data_start - _PREFIX.size - len(header_bytes)))
+        f.write(data)
+
+    # Readers either see the old or the new artifact, never a partial one
+    os.replace(tmp_path, path)
+    return header
+
+
+def read_header(path: PathLike) -> Tuple[dict, int]:
+    """Header and the file offset of the data section."""
+    with open(path, "rb") as f:
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise ValueError(f"{path} is not an index artifact")
+        magic, header_length = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an index artifact")
+        header = json.loads(f.read(header_length).decode("utf-8"))
+
+    if header.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported index artifact format {header.get('format')}")
+    return header, _align(_PREFIX.size + header_length)
+
+
+def read_version(path: PathLike) -> int:
+    return read_header(path)[0]["version"]
+
+
+def load_index(path: PathLike, verify: bool = True) -> CardIndex:
+    header, data_start = read_header(path)
+    if header["model"] != settings.CLIP_MODEL:
+        raise ValueError(
+            f"Index artifact was built for {header['model']}, service uses {settings.CLIP_MODEL}"
+        )
+
+    if verify:
+        with open(path, "rb") as f:
+            f.seek(data_start)
+            data = f.read()
+        expected = header.pop("checksum")
+        if _checksum(header, memoryview(data)) != expected:
+            raise ValueError(f"Index artifact {path} is corrupted, checksum mismatch")
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        shape = tuple(spec["shape"])
+        if 0 in shape:
+            arrays[name] = np.zeros(shape, dtype=np.dtype(spec["dtype"]))
+            continue
+        arrays[name] = np.memmap(
+            path, dtype=np.dtype(spec["dtype"]), mode="r",
+            offset=data_start + spec["offset"], shape=shape
+        )
+
+    cards = [CardRecord(**card) for card in header["cards"]]
+    return CardIndex(
+        cards, (arrays["embeddings"], arrays["has_embedding"]), header["version"]
+    )
@@ -1,14 +1,44 @@
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
 from src.the_way_recognition.config import settings
 
-engine = create_engine(
+_IS_SQLITE = make_url(settings.DATABASE_URL).get_backend_name() == "sqlite"
+_CONNECT_ARGS = {"check_same_thread": False, "timeout": 30} if _IS_SQLITE else {}
+
+# Writes: admin endpoints and scripts
+engine = create_engine(settings.DATABASE_URL, connect_args=_CONNECT_ARGS)
+
+# Reads: catalogue version checks and index loads, pooled and read-only
+read_engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+    connect_args=_CONNECT_ARGS,
+    pool_size=settings.DB_READ_POOL_SIZE,
 )
 
+
+def _configure_reader(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.DB_MMAP_SIZE)}")
+    # Negative values are KiB instead of pages
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.DB_CACHE_SIZE)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+# The journal mode is left alone: WAL needs the -wal and -shm files next to
+# the database, which breaks deployments that mount only cards.db itself
+if _IS_SQLITE:
+    event.listen(read_engine, "connect", _configure_reader)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSession = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 Base = declarative_base()
 
@@ -18,3 +48,61 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+@lru_cache()
+def get_async_read_sessionmaker():
+    # Imported lazily, only the async read path needs aiosqlite
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    url = make_url(settings.DATABASE_URL)
+    if _IS_SQLITE:
+        url = url.set(drivername="sqlite+aiosqlite")
+    async_engine = create_async_engine(url, connect_args={"timeout": 30} if _IS_SQLITE else {})
+    if _IS_SQLITE:
+        event.listen(async_engine.sync_engine, "connect", _configure_reader)
+    return async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+@contextmanager
+def bulk_write_session() -> Iterator[Session]:
+    """
+    Session for the ingestion scripts: its own unpooled connection tuned for
+    large transactions, so the pragmas never leak into the service's pool.
+    """
+    bulk_engine = create_engine(
+        settings.DATABASE_URL, connect_args=_CONNECT_ARGS, poolclass=NullPool
+    )
+    if _IS_SQLITE:
+        @event.listens_for(bulk_engine, "connect")
+        def _configure_bulk_writer(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            # A crash mid-import is fixed by rerunning the script
+            cursor.execute("PRAGMA synchronous=OFF")
+            cursor.execute(f"PRAGMA cache_size=-{int(settings.DB_CACHE_SIZE)}")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.close()
+
+    session = Session(bind=bulk_engine, autoflush=False)
+    try:
+        yield session
+    finally:
+        session.close()
+        bulk_engine.dispose()
+
+
+def init_db():
+    Base.metadata.create_all(bind=engine)
+
+    # create_all skips existing tables, so add columns introduced after the
+    # database was first populated (nullable, filled in by the scripts)
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                    ))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, LargeBinary
+from sqlalchemy import Column, Integer, String, LargeBinary
 from src.the_way_recognition.db.database import Base
 
 class Card(Base):
@@ -8,6 +8,16 @@ class Card(Base):
     rarity = Column(String)
     gt_text = Column(String)
     gt_embedding = Column(LargeBinary)
+    gt_hash = Column(String)
 
     def __repr__(self):
         return f"<Card(name='{self.name}', edition='{self.edition}', rarity='{self.rarity}')>"
+
+
+class CatalogueState(Base):
+    __tablename__ = 'catalogue_state'
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CatalogueState(version={self.version})>"
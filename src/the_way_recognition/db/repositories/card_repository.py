@@ -1,6 +1,19 @@
-from typing import List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+from sqlalchemy import Row, insert, select, update
 from sqlalchemy.orm import Session
-from src.the_way_recognition.db.models import Card
+from src.the_way_recognition.db.models import Card, CatalogueState
+
+if TYPE_CHECKING:
+    # Needs greenlet, which the sync scripts and workers don't
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# Columns the in-memory index is built from, read as plain rows
+INDEX_COLUMNS = (
+    Card.name, Card.edition, Card.rarity, Card.gt_text, Card.gt_hash, Card.gt_embedding
+)
+
+_VERSION_QUERY = select(CatalogueState.version).where(CatalogueState.id == 1)
+_INDEX_QUERY = select(*INDEX_COLUMNS)
 
 
 class CardRepository:
@@ -11,27 +24,77 @@ class CardRepository:
     def get_all(self) -> List[Card]:
         return self.session.query(Card).all()
 
-    def get_by_id(self, card_id: int) -> Optional[Card]:
-        return self.session.query(Card).filter(Card.id == card_id).first()
+    def get_index_rows(self) -> Sequence[Row]:
+        # Tuples instead of ORM objects, nothing is hydrated or tracked
+        return self.session.execute(_INDEX_QUERY).all()
 
     def get_by_name(self, name: str) -> Optional[Card]:
         return self.session.query(Card).filter(Card.name == name).first()
 
+    def get_version(self) -> int:
+        return self.session.scalar(_VERSION_QUERY) or 0
+
+    def _bump_version(self) -> None:
+        # Every write moves the catalogue version so snapshots and replicas
+        # can tell their cards are stale
+        updated = (
+            self.session.query(CatalogueState)
+            .filter(CatalogueState.id == 1)
+            .update({CatalogueState.version: CatalogueState.version + 1})
+        )
+        if not updated:
+            self.session.add(CatalogueState(id=1, version=1))
+
     def create(self, card: Card) -> Card:
         self.session.add(card)
+        self._bump_version()
         self.session.commit()
         self.session.refresh(card)
         return card
 
+    def create_many(self, cards: List[Card]) -> List[Card]:
+        self.session.add_all(cards)
+        self._bump_version()
+        self.session.commit()
+        return cards
+
+    def bulk_insert(self, rows: List[Dict]) -> int:
+        """Insert plain column dicts in one executemany, without the ORM unit of work."""
+        if rows:
+            self.session.execute(insert(Card), rows)
+        self._bump_version()
+        self.session.commit()
+        return len(rows)
+
+    def bulk_update(self, rows: List[Dict]) -> int:
+        """Update cards by name from column dicts, each must include "name"."""
+        if rows:
+            self.session.execute(update(Card), rows)
+        self._bump_version()
+        self.session.commit()
+        return len(rows)
+
     def update(self, card: Card) -> Card:
+        self._bump_version()
         self.session.commit()
         self.session.refresh(card)
         return card
 
-    def delete(self, card_id: int) -> bool:
-        card = self.get_by_id(card_id)
+    def delete(self, name: str) -> bool:
+        card = self.get_by_name(name)
         if card:
             self.session.delete(card)
+            self._bump_version()
             self.session.commit()
             return True
         return False
+
+
+class AsyncCardRepository:
+    """Read-only queries for code running on the event loop."""
+
+    def __init__(self, session: "AsyncSession"):
+        self.session = session
+
+    async def get_version(self) -> int:
+        return await self.session.scalar(_VERSION_QUERY) or 0
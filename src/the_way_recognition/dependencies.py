@@ -1,10 +1,26 @@
-from fastapi import Depends
+import secrets
+from typing import List, Optional
+from fastapi import Depends, Form, Header, HTTPException, Response
 from sqlalchemy.orm import Session
-from src.the_way_recognition.db.database import get_db
-from src.the_way_recognition.db.repositories.card_repository import CardRepository
+from src.the_way_recognition.db.database import (
+    ReadSession,
+    get_async_read_sessionmaker,
+    get_db
+)
+from src.the_way_recognition.db.repositories.card_repository import (
+    AsyncCardRepository,
+    CardRepository
+)
 from src.the_way_recognition.core.ocr import OCRService
 from src.the_way_recognition.core.embeddings import EmbeddingService
 from src.the_way_recognition.core.matching import CardMatcher
+from src.the_way_recognition.core.index import CardFilter, CardIndex, IndexHolder
+from src.the_way_recognition.core.snapshot import load_index, read_version
+from src.the_way_recognition.config import settings
+from src.the_way_recognition.core.detection import CardDetector
+from src.the_way_recognition.core.overload import Degradation, OverloadController, OverloadError
+from src.the_way_recognition.core.pipeline import RecognitionPipeline
+from src.the_way_recognition.jobs.store import JobStore
 from functools import lru_cache
 
 
@@ -19,6 +35,63 @@ def get_embedding_service() -> EmbeddingService:
     return EmbeddingService()
 
 
+@lru_cache()
+def get_card_detector() -> CardDetector:
+    return CardDetector()
+
+
+@lru_cache()
+def get_overload_controller() -> OverloadController:
+    return OverloadController()
+
+
+def _load_version() -> int:
+    with ReadSession() as session:
+        return CardRepository(session).get_version()
+
+
+def _load_index() -> CardIndex:
+    with ReadSession() as session:
+        repo = CardRepository(session)
+        # Same transaction, so the version matches the cards
+        return CardIndex.from_cards(repo.get_index_rows(), repo.get_version())
+
+
+async def load_catalogue_version() -> int:
+    async with get_async_read_sessionmaker()() as session:
+        return await AsyncCardRepository(session).get_version()
+
+
+@lru_cache()
+def get_index_holder() -> IndexHolder:
+    if settings.INDEX_ARTIFACT_PATH:
+        # Prebuilt artifact instead of the database, replacing the file
+        # rolls out a new catalogue on the next refresh
+        path = settings.INDEX_ARTIFACT_PATH
+        return IndexHolder(
+            lambda: read_version(path),
+            lambda: load_index(path, verify=settings.INDEX_ARTIFACT_VERIFY),
+        )
+    return IndexHolder(_load_version, _load_index)
+
+
+def require_writable_catalogue() -> None:
+    if settings.INDEX_ARTIFACT_PATH:
+        raise HTTPException(
+            status_code=409, detail="Catalogue is served from a read-only index artifact"
+        )
+
+
+def get_card_index(
+    response: Response,
+    holder: IndexHolder = Depends(get_index_holder),
+) -> CardIndex:
+    # One snapshot per request, even if a newer one is swapped in meanwhile
+    index = holder.current
+    response.headers["X-Catalogue-Version"] = str(index.version)
+    return index
+
+
 def get_card_repository(db: Session = Depends(get_db)) -> CardRepository:
     return CardRepository(db)
 
@@ -27,3 +100,58 @@ def get_card_matcher(
     embedding_service: EmbeddingService = Depends(get_embedding_service),
 ) -> CardMatcher:
     return CardMatcher(embedding_service)
+
+
+def get_recognition_pipeline(
+    ocr_service: OCRService = Depends(get_ocr_service),
+    card_matcher: CardMatcher = Depends(get_card_matcher),
+    index: CardIndex = Depends(get_card_index),
+    controller: OverloadController = Depends(get_overload_controller),
+) -> RecognitionPipeline:
+    return RecognitionPipeline(ocr_service, card_matcher, index, controller)
+
+
+def get_card_filter(
+    edition: List[str] = Form([]),
+    rarity: List[str] = Form([]),
+    candidates: List[str] = Form([]),
+) -> CardFilter:
+    return CardFilter(tuple(edition), tuple(rarity), tuple(candidates))
+
+
+def admit_request(
+    response: Response,
+    controller: OverloadController = Depends(get_overload_controller),
+):
+    try:
+        degradation = controller.acquire()
+    except OverloadError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after), "X-Degradation": Degradation.REJECTED.label},
+        )
+
+    response.headers["X-Degradation"] = degradation.label
+    try:
+        yield degradation
+    finally:
+        controller.release()
+
+
+def get_job_store():
+    store = JobStore()
+    try:
+        yield store
+    finally:
+        store.close()
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    # Bytes, compare_digest rejects str with non-ASCII characters
+    if not x_admin_token or not secrets.compare_digest(
+        x_admin_token.encode(), settings.ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
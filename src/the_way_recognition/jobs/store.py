@@ -0,0 +1,231 @@
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy import (
+    Column, DateTime, ForeignKey, Integer, String, Text, create_engine, event, func, or_
+)
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import Session, sessionmaker
+from src.the_way_recognition.config import settings
+
+engine = create_engine(
+    settings.JOBS_DATABASE_URL,
+    connect_args={"check_same_thread": False, "timeout": 30}
+)
+
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets the API read progress while worker processes write results
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+JobsSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+JobsBase = declarative_base()
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+COMPLETED = "completed"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _lease() -> datetime:
+    return _now() + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+
+
+class Job(JobsBase):
+    __tablename__ = "jobs"
+    id = Column(String, primary_key=True)
+    status = Column(String, nullable=False, default=PENDING)
+    total = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=_now)
+    finished_at = Column(DateTime(timezone=True))
+
+    def __repr__(self):
+        return f"<Job(id='{self.id}', status='{self.status}', total={self.total})>"
+
+
+class JobItem(JobsBase):
+    __tablename__ = "job_items"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(String, ForeignKey("jobs.id"), nullable=False, index=True)
+    position = Column(Integer, nullable=False)
+    filename = Column(String, nullable=False)
+    path = Column(String, nullable=False)
+    status = Column(String, nullable=False, default=PENDING, index=True)
+    claimed_by = Column(String)
+    # Renewed by the claiming worker while it runs, an expired lease means it died
+    lease_expires_at = Column(DateTime(timezone=True))
+    result = Column(Text)
+    error = Column(String)
+
+    def to_record(self) -> dict:
+        record = {"position": self.position, "filename": self.filename, "status": self.status}
+        if self.status == DONE:
+            record["result"] = json.loads(self.result)
+        else:
+            record["error"] = self.error
+        return record
+
+
+class JobStore:
+    """Durable work queue for bulk recognition, shared by the API and worker processes."""
+
+    def __init__(self, session: Optional[Session] = None):
+        self.session = session or JobsSession()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def create_job(self, job_id: str, files: List[tuple]) -> Job:
+        """files is a list of (filename, stored path) in submission order."""
+        job = Job(id=job_id, status=PENDING, total=len(files))
+        self.session.add(job)
+        self.session.add_all(
+            JobItem(job_id=job.id, position=i, filename=filename, path=path)
+            for i, (filename, path) in enumerate(files)
+        )
+        self.session.commit()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        return self.session.get(Job, job_id)
+
+    def count_by_status(self, job_id: str) -> Dict[str, int]:
+        rows = (
+            self.session.query(JobItem.status, func.count(JobItem.id))
+            .filter(JobItem.job_id == job_id)
+            .group_by(JobItem.status)
+            .all()
+        )
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def iter_finished(self, job_id: str, after_position: int = -1) -> Iterator[JobItem]:
+        return iter(
+            self.session.query(JobItem)
+            .filter(
+                JobItem.job_id == job_id,
+                JobItem.status.in_((DONE, FAILED)),
+                JobItem.position > after_position,
+            )
+            .order_by(JobItem.position)
+            .all()
+        )
+
+    def delete_job(self, job_id: str) -> bool:
+        job = self.get_job(job_id)
+        if not job:
+            return False
+        self.session.query(JobItem).filter(JobItem.job_id == job_id).delete()
+        self.session.delete(job)
+        self.session.commit()
+        return True
+
+    def claim(self, worker_id: str, limit: int) -> List[JobItem]:
+        claimed = []
+        while len(claimed) < limit:
+            candidate = (
+                self.session.query(JobItem.id)
+                .filter(JobItem.status == PENDING)
+                .order_by(JobItem.id)
+                .first()
+            )
+            if candidate is None:
+                break
+
+            # Conditional update so two workers never take the same item
+            updated = (
+                self.session.query(JobItem)
+                .filter(JobItem.id == candidate.id, JobItem.status == PENDING)
+                .update(
+                    {"status": RUNNING, "claimed_by": worker_id, "lease_expires_at": _lease()},
+                    synchronize_session=False,
+                )
+            )
+            self.session.commit()
+            if updated:
+                claimed.append(self.session.get(JobItem, candidate.id))
+
+        for job_id in {item.job_id for item in claimed}:
+            self.session.query(Job).filter(Job.id == job_id, Job.status == PENDING).update(
+                {"status": RUNNING}, synchronize_session=False
+            )
+        self.session.commit()
+        return claimed
+
+    def complete(self, item: JobItem, result: dict) -> None:
+        self._finish(item, {"status": DONE, "result": json.dumps(result)})
+
+    def fail(self, item: JobItem, error: str) -> None:
+        self._finish(item, {"status": FAILED, "error": error})
+
+    def _finish(self, item: JobItem, values: dict) -> None:
+        # Bulk update instead of flushing the object, the job may have been
+        # deleted while the item was being processed
+        self.session.query(JobItem).filter(JobItem.id == item.id).update(
+            values, synchronize_session=False
+        )
+        self.session.commit()
+        remaining = (
+            self.session.query(func.count(JobItem.id))
+            .filter(JobItem.job_id == item.job_id, JobItem.status.in_((PENDING, RUNNING)))
+            .scalar()
+        )
+        if not remaining:
+            self.session.query(Job).filter(Job.id == item.job_id).update(
+                {"status": COMPLETED, "finished_at": _now()}, synchronize_session=False
+            )
+            self.session.commit()
+
+    def renew_leases(self, worker_id: str) -> int:
+        count = (
+            self.session.query(JobItem)
+            .filter(JobItem.status == RUNNING, JobItem.claimed_by == worker_id)
+            .update({"lease_expires_at": _lease()}, synchronize_session=False)
+        )
+        self.session.commit()
+        return count
+
+    def release(self, worker_id: str) -> int:
+        """Hand the items claimed by worker_id back to the queue."""
+        count = (
+            self.session.query(JobItem)
+            .filter(JobItem.status == RUNNING, JobItem.claimed_by == worker_id)
+            .update(
+                {"status": PENDING, "claimed_by": None, "lease_expires_at": None},
+                synchronize_session=False,
+            )
+        )
+        self.session.commit()
+        return count
+
+    def requeue_expired(self) -> int:
+        """Hand items whose worker stopped renewing its lease back to the queue."""
+        count = (
+            self.session.query(JobItem)
+            .filter(
+                JobItem.status == RUNNING,
+                or_(JobItem.lease_expires_at.is_(None), JobItem.lease_expires_at < _now()),
+            )
+            .update(
+                {"status": PENDING, "claimed_by": None, "lease_expires_at": None},
+                synchronize_session=False,
+            )
+        )
+        self.session.commit()
+        return count
+
+
+def init_jobs_db():
+    JobsBase.metadata.create_all(bind=engine)
@@ -0,0 +1,199 @@
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+from pathlib import Path
+from typing import List, Optional
+from PIL import Image
+import torch
+from src.the_way_recognition.api.schemas.card import CardRecognitionResponse
+from src.the_way_recognition.config import settings
+from src.the_way_recognition.core.pipeline import RecognitionPipeline
+from src.the_way_recognition.dependencies import (
+    get_card_matcher,
+    get_embedding_service,
+    get_index_holder,
+    get_ocr_service,
+)
+from src.the_way_recognition.jobs.store import JobStore, init_jobs_db
+from src.the_way_recognition.utils.image import limit_size
+
+logger = logging.getLogger(__name__)
+
+
+def _lower_priority() -> None:
+    # Bulk work must not compete with interactive /recognize-card traffic
+    if settings.JOB_WORKER_NICE and hasattr(os, "nice"):
+        os.nice(settings.JOB_WORKER_NICE)
+    torch.set_num_threads(settings.JOB_WORKER_THREADS)
+
+
+def _load_image(path: str) -> Image.Image:
+    with Image.open(path) as image:
+        return limit_size(image.convert("RGB"), settings.MAX_IMAGE_DIM)
+
+
+def _error_message(item, error: Exception) -> str:
+    # Errors are returned to clients, name the submitted file instead of
+    # the path it is stored at on the server
+    return str(error).replace(item.path, item.filename)
+
+
+def _requeue_expired(store: JobStore, worker_id: str) -> None:
+    # Nothing of this worker is in flight here, so its own claims are stale too
+    requeued = store.release(worker_id) + store.requeue_expired()
+    if requeued:
+        logger.info("Requeued %d job items with an expired lease", requeued)
+
+
+def _heartbeat(worker_id: str, done: threading.Event) -> None:
+    # Separate connection, a long batch must not let the lease run out
+    store = JobStore()
+    try:
+        while not done.wait(settings.JOB_LEASE_SECONDS / 3):
+            try:
+                store.renew_leases(worker_id)
+            except Exception:
+                logger.exception("Job worker %s failed to renew its leases", worker_id)
+                store.session.rollback()
+    finally:
+        store.close()
+
+
+def _process(worker_id: str, store: JobStore, ocr_service, card_matcher) -> bool:
+    """Claim and run one batch, False when the queue was empty."""
+    items = store.claim(worker_id, settings.JOB_BATCH_SIZE)
+    if not items:
+        # Also covers items of workers that died since this one started
+        _requeue_expired(store, worker_id)
+        return False
+
+    images: List[Optional[Image.Image]] = []
+    for item in items:
+        try:
+            images.append(_load_image(item.path))
+        except Exception as e:
+            store.fail(item, f"Invalid image file: {_error_message(item, e)}")
+            Path(item.path).unlink(missing_ok=True)
+            images.append(None)
+
+    ready = [(item, image) for item, image in zip(items, images) if image is not None]
+    if not ready:
+        return True
+
+    # Picks up catalogue changes made through the API or the scripts
+    index = get_index_holder().refresh()
+    pipeline = RecognitionPipeline(ocr_service, card_matcher, index)
+    try:
+        results = pipeline.recognize_batch([image for _, image in ready])
+    except Exception as e:
+        logger.exception("Job worker %s failed a batch", worker_id)
+        for item, _ in ready:
+            store.fail(item, _error_message(item, e))
+        return True
+
+    for (item, _), result in zip(ready, results):
+        store.complete(item, CardRecognitionResponse.from_result(result).model_dump())
+        Path(item.path).unlink(missing_ok=True)
+    return True
+
+
+def run_worker(worker_id: str, stop_event) -> None:
+    _lower_priority()
+    ocr_service = get_ocr_service()
+    card_matcher = get_card_matcher(get_embedding_service())
+    store = JobStore()
+    done = threading.Event()
+    heartbeat = threading.Thread(
+        target=_heartbeat, args=(worker_id, done), daemon=True
+    )
+    heartbeat.start()
+    logger.info("Job worker %s started", worker_id)
+
+    failures = 0
+    try:
+        # Items left by a worker that died before this one started, a
+        # restarted worker reuses its predecessor's id
+        try:
+            _requeue_expired(store, worker_id)
+        except Exception:
+            logger.exception("Job worker %s failed to requeue expired items", worker_id)
+            store.session.rollback()
+
+        while not stop_event.is_set():
+            try:
+                busy = _process(worker_id, store, ocr_service, card_matcher)
+                failures = 0
+                if not busy:
+                    stop_event.wait(settings.JOB_POLL_INTERVAL)
+            except Exception:
+                # e.g. "database is locked", the batch goes back to the queue
+                # here or, if that fails too, on the next idle poll
+                failures += 1
+                logger.exception("Job worker %s failed, retrying", worker_id)
+                store.session.rollback()
+                try:
+                    store.release(worker_id)
+                except Exception:
+                    store.session.rollback()
+                stop_event.wait(min(settings.JOB_POLL_INTERVAL * 2 ** failures, 60.0))
+    finally:
+        done.set()
+        heartbeat.join()
+        store.close()
+
+
+class WorkerPool:
+    def __init__(self, size: int):
+        self.size = size
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = self._context.Event()
+        self._processes = []
+        self._monitor: Optional[threading.Thread] = None
+
+    def _spawn(self, i: int):
+        process = self._context.Process(
+            target=run_worker,
+            args=(f"{socket.gethostname()}-{os.getpid()}-{i}", self._stop_event),
+            name=f"job-worker-{i}",
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def _watch(self) -> None:
+        # Replaces workers that crashed or were killed, e.g. by the OOM killer
+        while not self._stop_event.wait(settings.JOB_POLL_INTERVAL):
+            for i, process in enumerate(self._processes):
+                if not process.is_alive() and not self._stop_event.is_set():
+                    logger.warning(
+                        "Job worker %s exited with code %s, restarting", process.name, process.exitcode
+                    )
+                    self._processes[i] = self._spawn(i)
+
+    def start(self) -> None:
+        if self.size <= 0:
+            return
+
+        self._processes = [self._spawn(i) for i in range(self.size)]
+        self._monitor = threading.Thread(target=self._watch, name="job-worker-monitor", daemon=True)
+        self._monitor.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop_event.set()
+        if self._monitor:
+            self._monitor.join()
+            self._monitor = None
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes.clear()
+
+
+if __name__ == "__main__":
+    # Standalone worker process, for running the API with JOB_WORKERS=0
+    logging.basicConfig(level=logging.INFO)
+    init_jobs_db()
+    run_worker(f"{socket.gethostname()}-{os.getpid()}", multiprocessing.Event())
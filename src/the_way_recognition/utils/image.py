@@ -1,20 +1,28 @@
+from typing import Optional
 from fastapi import UploadFile
 from PIL import Image
 from io import BytesIO
 from src.the_way_recognition.config import settings
+from src.the_way_recognition.core import profiling
 
 
-async def preprocess_image(file: UploadFile) -> Image.Image:
-    try:
-        contents = await file.read()
-        image = Image.open(BytesIO(contents)).convert("RGB")
+def limit_size(image: Image.Image, max_dim: int) -> Image.Image:
+    # Resize if too large
+    if max(image.size) > max_dim:
+        image.thumbnail((max_dim, max_dim), Image.LANCZOS)
+    return image
 
-        # Resize if too large
-        if max(image.size) > settings.MAX_IMAGE_DIM:
-            image.thumbnail(
-                (settings.MAX_IMAGE_DIM, settings.MAX_IMAGE_DIM), Image.LANCZOS
-            )
 
-        return image
+def decode_image(contents: bytes, max_dim: Optional[int] = None) -> Image.Image:
+    try:
+        image = Image.open(BytesIO(contents)).convert("RGB")
+        return limit_size(image, max_dim or settings.MAX_IMAGE_DIM)
     except Exception as e:
         raise ValueError(f"Invalid image file: {str(e)}")
+
+
+async def preprocess_image(file: UploadFile, max_dim: Optional[int] = None) -> Image.Image:
+    contents = await file.read()
+    profiling.record_input(file.filename, contents)
+    with profiling.stage("decode"):
+        return decode_image(contents, max_dim)
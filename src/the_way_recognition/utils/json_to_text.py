@@ -1,9 +1,7 @@
 import json
 
 
-def card_json_to_text(file_path):
-    with open(file_path, "r", encoding="utf-8") as f:
-        card = json.load(f)
+def card_to_text(card: dict) -> str:
     name = card.get("name", "")
     description = card.get("description", "")
     index = card.get("index", "")
@@ -11,3 +9,9 @@ def card_json_to_text(file_path):
     footer = card.get("footer", "")
     text_block = f"{name}\n\n{description}\n\n{index} {rarity}\n{footer}"
     return text_block
+
+
+def card_json_to_text(file_path):
+    with open(file_path, "r", encoding="utf-8") as f:
+        card = json.load(f)
+    return card_to_text(card)
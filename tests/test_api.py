@@ -1,11 +1,24 @@
 import pytest
 import requests
+import base64
+import struct
 from pathlib import Path
 import io
+import os
+import json
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 
 API_URL = "http://127.0.0.1:8000/api/v1/recognize-card"
+MULTI_API_URL = "http://127.0.0.1:8000/api/v1/recognize-cards"
+FEATURES_API_URL = "http://127.0.0.1:8000/api/v1/recognize-features"
+JOBS_API_URL = "http://127.0.0.1:8000/api/v1/jobs"
+CATALOGUE_API_URL = "http://127.0.0.1:8000/api/v1/catalogue"
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
 SAMPLES_DIR = Path("data/")
+REFERENCE_DIR = Path("data/gt/png")
 TEST_IMAGE = "1.jpg"
 TIMEOUT = 30  # seconds
 
@@ -54,12 +67,15 @@ class TestRecognizeCardEndpoint:
         assert response.status_code == 200
         data = response.json()
 
-        assert set(data.keys()) == {"is_card", "card", "confidence"}
+        assert set(data.keys()) == {"is_card", "card", "confidence", "degradation"}
+        assert data["degradation"] in {"none", "reduced_resolution", "embedding_only"}
+        assert response.headers["X-Degradation"] == data["degradation"]
 
         assert set(data["card"].keys()) == {
             "name",
             "text_match_score",
             "embedding_match_score",
+            "hash_match_score",
         }
 
         assert isinstance(data["is_card"], bool)
@@ -170,6 +186,7 @@ class TestRecognizeCardEndpoint:
             assert (
                 data["card"]["text_match_score"] >= 0.5
                 or data["card"]["embedding_match_score"] >= 0.5
+                or data["card"]["hash_match_score"] >= 0.5
             )
 
         if not data["is_card"]:
@@ -261,6 +278,79 @@ class TestRecognizeCardEndpoint:
 
         assert len(results) > 0, "No test images were processed"
 
+    def test_concurrent_requests_degrade_or_shed(self, api_url):
+        img = Image.new("RGB", (500, 700), color="blue")
+        img_bytes = io.BytesIO()
+        img.save(img_bytes, format="JPEG")
+
+        def post(_):
+            files = {"file": ("test.jpg", io.BytesIO(img_bytes.getvalue()), "image/jpeg")}
+            return requests.post(api_url, files=files, timeout=TIMEOUT * 4)
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            responses = list(executor.map(post, range(48)))
+
+        for response in responses:
+            assert response.status_code in (200, 503)
+            if response.status_code == 503:
+                assert int(response.headers["Retry-After"]) > 0
+                assert response.headers["X-Degradation"] == "rejected"
+            else:
+                assert response.json()["degradation"] == response.headers["X-Degradation"]
+
+    def test_filter_without_matching_cards(self, api_url):
+        img = Image.new("RGB", (100, 100), color="red")
+        img_bytes = io.BytesIO()
+        img.save(img_bytes, format="JPEG")
+        img_bytes.seek(0)
+
+        files = {"file": ("test.jpg", img_bytes, "image/jpeg")}
+        data = {"edition": "no-such-edition"}
+        response = requests.post(api_url, files=files, data=data, timeout=TIMEOUT)
+
+        assert response.status_code == 400
+        assert "No cards match" in response.json()["detail"]
+
+    def test_candidate_filter_restricts_result(self, api_url):
+        image_path = SAMPLES_DIR / TEST_IMAGE
+
+        if not image_path.exists():
+            pytest.skip("Sample image not found")
+
+        with open(image_path, "rb") as img_file:
+            files = {"file": (TEST_IMAGE, img_file, "image/jpeg")}
+            response = requests.post(api_url, files=files, timeout=TIMEOUT)
+        name = response.json()["card"]["name"]
+
+        if name is None:
+            pytest.skip("Sample image was not recognized")
+
+        with open(image_path, "rb") as img_file:
+            files = {"file": (TEST_IMAGE, img_file, "image/jpeg")}
+            data = [("candidates", name), ("candidates", "SOME OTHER CARD")]
+            response = requests.post(api_url, files=files, data=data, timeout=TIMEOUT)
+
+        assert response.status_code == 200
+        assert response.json()["card"]["name"] in (name, None)
+
+    def test_reference_image_hash_match(self, api_url):
+        image_path = REFERENCE_DIR / "1.png"
+
+        if not image_path.exists():
+            pytest.skip("Reference image not found")
+
+        with open(image_path, "rb") as img_file:
+            files = {"file": ("1.png", img_file, "image/png")}
+            response = requests.post(api_url, files=files, timeout=TIMEOUT)
+
+        assert response.status_code == 200
+        data = response.json()
+
+        assert data["is_card"] is True
+        assert data["confidence"] == "high"
+        assert data["card"]["name"] is not None
+        assert data["card"]["hash_match_score"] > 0.9
+
     @pytest.mark.parametrize("image_num", range(1, 9))
     def test_no_false_negatives_on_samples(self, api_url, image_num):
         image_path = SAMPLES_DIR / f"{image_num}.jpg"
@@ -277,10 +367,334 @@ class TestRecognizeCardEndpoint:
         has_some_signal = (
             data["card"]["text_match_score"] > 0.5
             or data["card"]["embedding_match_score"] > 0.5
+            or data["card"]["hash_match_score"] > 0.5
         )
         assert has_some_signal, f"Image {image_num}.jpg shows no recognition signal"
 
 
+class TestRecognizeCardsEndpoint:
+
+    @staticmethod
+    def _page(images, columns=3, card_size=(315, 440), gap=40):
+        rows = (len(images) + columns - 1) // columns
+        width = columns * card_size[0] + (columns + 1) * gap
+        height = rows * card_size[1] + (rows + 1) * gap
+        page = Image.new("RGB", (width, height), color="white")
+        for i, img in enumerate(images):
+            row, col = divmod(i, columns)
+            x = gap + col * (card_size[0] + gap)
+            y = gap + row * (card_size[1] + gap)
+            page.paste(img.convert("RGB").resize(card_size), (x, y))
+        return page
+
+    def test_grid_of_cards(self):
+        image_paths = [SAMPLES_DIR / f"{i}.jpg" for i in range(1, 10)]
+        image_paths = [path for path in image_paths if path.exists()]
+
+        if not image_paths:
+            pytest.skip("Sample images not found")
+
+        page = self._page([Image.open(path) for path in image_paths])
+        img_bytes = io.BytesIO()
+        page.save(img_bytes, format="JPEG")
+        img_bytes.seek(0)
+
+        files = {"file": ("page.jpg", img_bytes, "image/jpeg")}
+        response = requests.post(MULTI_API_URL, files=files, timeout=TIMEOUT)
+
+        assert response.status_code == 200
+        data = response.json()
+
+        assert data["count"] == len(image_paths)
+        assert len(data["cards"]) == data["count"]
+        for card in data["cards"]:
+            assert set(card.keys()) == {"is_card", "card", "confidence", "degradation", "bbox"}
+            assert set(card["bbox"].keys()) == {"x", "y", "width", "height"}
+            assert card["bbox"]["x"] + card["bbox"]["width"] <= page.width
+            assert card["bbox"]["y"] + card["bbox"]["height"] <= page.height
+
+        # Reading order, row by row from the top left
+        for i, card in enumerate(data["cards"]):
+            row, col = divmod(i, 3)
+            center_x = card["bbox"]["x"] + card["bbox"]["width"] / 2
+            center_y = card["bbox"]["y"] + card["bbox"]["height"] / 2
+            assert int(center_x * 3 / page.width) == col
+            assert int(center_y * ((len(image_paths) + 2) // 3) / page.height) == row
+
+    def test_single_card_falls_back_to_whole_image(self):
+        img = Image.new("RGB", (500, 500), color="blue")
+        img_bytes = io.BytesIO()
+        img.save(img_bytes, format="JPEG")
+        img_bytes.seek(0)
+
+        files = {"file": ("blue.jpg", img_bytes, "image/jpeg")}
+        response = requests.post(MULTI_API_URL, files=files, timeout=TIMEOUT)
+
+        assert response.status_code == 200
+        data = response.json()
+
+        assert data["count"] == 1
+        assert data["cards"][0]["bbox"] == {"x": 0, "y": 0, "width": 500, "height": 500}
+
+    def test_invalid_file_format(self):
+        fake_file = io.BytesIO(b"This is not an image file")
+        files = {"file": ("test.txt", fake_file, "text/plain")}
+
+        response = requests.post(MULTI_API_URL, files=files, timeout=TIMEOUT)
+
+        assert response.status_code == 400
+        assert "Invalid image file" in response.json()["detail"]
+
+
+class TestRecognizeFeaturesEndpoint:
+
+    @staticmethod
+    def _model():
+        return os.environ.get("CLIP_MODEL", "ViT-B/32")
+
+    def test_text_only(self):
+        response = requests.post(
+            FEATURES_API_URL, json={"ocr_text": "some card text"}, timeout=TIMEOUT
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data.keys()) == {"is_card", "card", "confidence", "degradation"}
+        # No vector was sent, so there is no embedding score to report
+        assert data["card"]["embedding_match_score"] == 0.0
+        assert data["card"]["hash_match_score"] == 0.0
+
+    def test_missing_features(self):
+        response = requests.post(FEATURES_API_URL, json={}, timeout=TIMEOUT)
+
+        assert response.status_code == 422
+
+    def test_embedding_from_other_model(self):
+        payload = {"model": "some-other-model", "embedding": [0.1] * 512}
+        response = requests.post(FEATURES_API_URL, json=payload, timeout=TIMEOUT)
+
+        assert response.status_code == 422
+        assert "does not match" in response.text
+
+    def test_embedding_dimension_mismatch(self):
+        payload = {"model": self._model(), "embedding": [0.1, 0.2, 0.3]}
+        response = requests.post(FEATURES_API_URL, json=payload, timeout=TIMEOUT)
+
+        assert response.status_code == 400
+        assert "dimensions" in response.json()["detail"]
+
+    def test_compact_embedding(self):
+        vector = struct.pack("<512f", *([0.1] * 512))
+        payload = {
+            "model": self._model(),
+            "embedding_base64": base64.b64encode(vector).decode("ascii"),
+        }
+        response = requests.post(FEATURES_API_URL, json=payload, timeout=TIMEOUT)
+
+        assert response.status_code == 200
+        assert 0.0 <= response.json()["card"]["embedding_match_score"] <= 1.0
+
+
+class TestJobsEndpoint:
+
+    @staticmethod
+    def _image_bytes(color, format="JPEG"):
+        img = Image.new("RGB", (200, 280), color=color)
+        img_bytes = io.BytesIO()
+        img.save(img_bytes, format=format)
+        return img_bytes.getvalue()
+
+    def _wait_for_completion(self, job_id, timeout=120):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            response = requests.get(f"{JOBS_API_URL}/{job_id}", timeout=TIMEOUT)
+            assert response.status_code == 200
+            data = response.json()
+            if data["status"] == "completed":
+                return data
+            time.sleep(1)
+        pytest.fail(f"Job {job_id} did not complete in {timeout}s")
+
+    def test_job_from_archive(self):
+        archive_bytes = io.BytesIO()
+        with zipfile.ZipFile(archive_bytes, "w") as archive:
+            archive.writestr("cards/a.jpg", self._image_bytes("red"))
+            archive.writestr("cards/b.png", self._image_bytes("blue", "PNG"))
+            archive.writestr("cards/notes.txt", "not an image")
+        archive_bytes.seek(0)
+
+        files = [("files", ("cards.zip", archive_bytes, "application/zip"))]
+        response = requests.post(JOBS_API_URL, files=files, timeout=TIMEOUT)
+
+        assert response.status_code == 202
+        job = response.json()
+        assert job["total"] == 2
+
+        data = self._wait_for_completion(job["job_id"])
+        assert data["progress"]["done"] + data["progress"]["failed"] == 2
+
+        response = requests.get(f"{JOBS_API_URL}/{job['job_id']}/results", timeout=TIMEOUT)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert [record["filename"] for record in records] == ["cards/a.jpg", "cards/b.png"]
+        for record in records:
+            if record["status"] == "done":
+                assert set(record["result"].keys()) == {
+                    "is_card", "card", "confidence", "degradation"
+                }
+
+        response = requests.delete(f"{JOBS_API_URL}/{job['job_id']}", timeout=TIMEOUT)
+        assert response.status_code == 204
+
+    def test_job_from_multiple_uploads(self):
+        files = [
+            ("files", ("1.jpg", self._image_bytes("green"), "image/jpeg")),
+            ("files", ("2.txt", b"This is not an image file", "text/plain")),
+        ]
+        response = requests.post(JOBS_API_URL, files=files, timeout=TIMEOUT)
+
+        assert response.status_code == 202
+        job = response.json()
+        assert job["total"] == 2
+
+        self._wait_for_completion(job["job_id"])
+        response = requests.get(
+            f"{JOBS_API_URL}/{job['job_id']}/results", params={"follow": True}, timeout=TIMEOUT
+        )
+        records = [json.loads(line) for line in response.text.splitlines()]
+
+        assert [record["position"] for record in records] == [0, 1]
+        assert records[1]["status"] == "failed"
+        assert "Invalid image file" in records[1]["error"]
+
+    def test_archive_without_images(self):
+        archive_bytes = io.BytesIO()
+        with zipfile.ZipFile(archive_bytes, "w") as archive:
+            archive.writestr("notes.txt", "not an image")
+        archive_bytes.seek(0)
+
+        files = [("files", ("empty.zip", archive_bytes, "application/zip"))]
+        response = requests.post(JOBS_API_URL, files=files, timeout=TIMEOUT)
+
+        assert response.status_code == 400
+
+    def test_unknown_job(self):
+        response = requests.get(f"{JOBS_API_URL}/does-not-exist", timeout=TIMEOUT)
+
+        assert response.status_code == 404
+
+
+class TestCatalogueEndpoint:
+
+    @staticmethod
+    def _card_image():
+        img = Image.new("RGB", (630, 880), color="white")
+        for x in range(0, 630, 90):
+            img.paste((x % 255, 40, 200), (x, 0, x + 45, 880))
+        img_bytes = io.BytesIO()
+        img.save(img_bytes, format="PNG")
+        return img_bytes.getvalue()
+
+    def _wait_for_version(self, version, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            data = requests.get(CATALOGUE_API_URL, timeout=TIMEOUT).json()
+            if data["version"] >= version:
+                return data
+            time.sleep(0.5)
+        pytest.fail(f"Catalogue did not reach version {version} in {timeout}s")
+
+    def test_catalogue_version(self):
+        response = requests.get(CATALOGUE_API_URL, timeout=TIMEOUT)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data.keys()) == {"version", "cards"}
+        assert data["version"] >= 0
+        assert data["cards"] >= 0
+
+    def test_recognition_reports_catalogue_version(self, api_url):
+        img = Image.new("RGB", (100, 100), color="red")
+        img_bytes = io.BytesIO()
+        img.save(img_bytes, format="JPEG")
+        img_bytes.seek(0)
+
+        files = {"file": ("test.jpg", img_bytes, "image/jpeg")}
+        response = requests.post(api_url, files=files, timeout=TIMEOUT)
+
+        assert int(response.headers["X-Catalogue-Version"]) >= 0
+
+    def test_admin_requires_token(self):
+        files = {"file": ("card.png", self._card_image(), "image/png")}
+        data = {"name": "TEST CARD", "text": "TEST CARD"}
+        response = requests.post(
+            f"{CATALOGUE_API_URL}/cards",
+            files=files,
+            data=data,
+            headers={"X-Admin-Token": "wrong-token"},
+            timeout=TIMEOUT,
+        )
+
+        assert response.status_code in (401, 403)
+
+    def test_add_update_and_remove_card(self, api_url):
+        if not ADMIN_TOKEN:
+            pytest.skip("ADMIN_TOKEN not set")
+
+        headers = {"X-Admin-Token": ADMIN_TOKEN}
+        name = f"TEST CARD {time.time_ns()}"
+        image = self._card_image()
+
+        files = {"file": ("card.png", image, "image/png")}
+        data = {"name": name, "edition": "9", "rarity": "C", "description": "Test card"}
+        response = requests.post(
+            f"{CATALOGUE_API_URL}/cards", files=files, data=data, headers=headers, timeout=TIMEOUT
+        )
+        assert response.status_code == 201
+        version = response.json()["version"]
+        self._wait_for_version(version)
+
+        files = {"file": ("card.png", image, "image/png")}
+        response = requests.post(
+            api_url, files=files, data={"candidates": name}, timeout=TIMEOUT
+        )
+        assert response.status_code == 200
+        assert response.json()["card"]["name"] == name
+        assert int(response.headers["X-Catalogue-Version"]) >= version
+
+        # The rarity is part of the stored text, so it can't change on its own
+        response = requests.put(
+            f"{CATALOGUE_API_URL}/cards/{name}", data={"rarity": "R"}, headers=headers, timeout=TIMEOUT
+        )
+        assert response.status_code == 400
+
+        data = {"rarity": "R", "description": "Test card"}
+        response = requests.put(
+            f"{CATALOGUE_API_URL}/cards/{name}", data=data, headers=headers, timeout=TIMEOUT
+        )
+        assert response.status_code == 200
+        assert response.json()["version"] > version
+
+        response = requests.delete(
+            f"{CATALOGUE_API_URL}/cards/{name}", headers=headers, timeout=TIMEOUT
+        )
+        assert response.status_code == 200
+        self._wait_for_version(response.json()["version"])
+
+        files = {"file": ("card.png", image, "image/png")}
+        response = requests.post(
+            api_url, files=files, data={"candidates": name}, timeout=TIMEOUT
+        )
+        assert response.status_code == 400
+
+        response = requests.delete(
+            f"{CATALOGUE_API_URL}/cards/{name}", headers=headers, timeout=TIMEOUT
+        )
+        assert response.status_code == 404
+
+
 class TestAPIHealth:
 
     def test_api_is_running(self, api_url):
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from src.the_way_recognition.config import settings
+from src.the_way_recognition.core.index import CardIndex, CardRecord
+from src.the_way_recognition.core.snapshot import load_index, read_header, save_index
+
+
+def _index(order=(0, 1, 2), version=7):
+    cards = [
+        CardRecord("ALPHA", "1", "C", "ALPHA\n\nfirst card", "00ff00ff00ff00ff"),
+        CardRecord("BETA", "1", "R", "BETA\n\nsecond card", None),
+        CardRecord("GAMMA", "2", "U", "GAMMA\n\nno embedding", "ff00ff00ff00ff00"),
+    ]
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((3, 512)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    has_embedding = np.array([True, True, False])
+    embeddings[~has_embedding] = 0
+
+    order = list(order)
+    return CardIndex(
+        [cards[i] for i in order], (embeddings[order], has_embedding[order]), version
+    )
+
+
+def test_round_trip(tmp_path):
+    index = _index()
+    path = tmp_path / "cards.twidx"
+    save_index(index, path)
+
+    loaded = load_index(path)
+
+    assert loaded.version == index.version
+    assert loaded.cards == index.cards
+    np.testing.assert_array_equal(loaded.embeddings, index.embeddings)
+    np.testing.assert_array_equal(loaded.has_embedding, index.has_embedding)
+
+
+def test_build_is_deterministic(tmp_path):
+    # Same catalogue, rows in a different order
+    first, second = tmp_path / "first.twidx", tmp_path / "second.twidx"
+    save_index(_index((0, 1, 2)), first)
+    save_index(_index((2, 0, 1)), second)
+
+    assert first.read_bytes() == second.read_bytes()
+
+
+def test_checksum_mismatch_is_rejected(tmp_path):
+    path = tmp_path / "cards.twidx"
+    save_index(_index(), path)
+    _, data_start = read_header(path)
+
+    content = bytearray(path.read_bytes())
+    content[data_start] ^= 0xFF
+    path.write_bytes(bytes(content))
+
+    with pytest.raises(ValueError, match="checksum"):
+        load_index(path)
+
+
+def test_other_model_is_rejected(tmp_path, monkeypatch):
+    path = tmp_path / "cards.twidx"
+    save_index(_index(), path)
+
+    monkeypatch.setattr(settings, "CLIP_MODEL", "RN50")
+    with pytest.raises(ValueError, match="RN50"):
+        load_index(path)